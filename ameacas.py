@@ -0,0 +1,108 @@
+from movimentos import pos_valida
+from bitboard import CASAS, INDICE, BIT, NUM_CASAS, Posicao, de_tabuleiro, saltos_onca
+
+# mapa de ameacas sobre as mascaras da posicao: fazer/desfazer_movimento ja mantem onca e
+# caes, e tudo que a avaliacao e a ordenacao perguntam por cao sai delas em O(1) com as
+# tabelas abaixo, sem varrer vizinhos no tabuleiro
+
+def _mascara(casas):
+    m = 0
+    for l, c in casas:
+        if pos_valida(l, c):
+            m |= BIT[INDICE[(l, c)]]
+    return m
+
+VIZINHOS_ORTOGONAIS = [_mascara([(l - 1, c), (l + 1, c), (l, c - 1), (l, c + 1)]) for l, c in CASAS]
+VIZINHOS_DIAGONAIS = [_mascara([(l - 1, c - 1), (l - 1, c + 1), (l + 1, c - 1), (l + 1, c + 1)]) for l, c in CASAS]
+VIZINHOS = [o | d for o, d in zip(VIZINHOS_ORTOGONAIS, VIZINHOS_DIAGONAIS)]
+
+def _diagonais(l, c):
+    # por onde a onca salta este cao na diagonal: (pouso, casa da onca, adjacentes que protegem)
+    diagonais = []
+    for dir_l, dir_c in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
+        pouso = (l + dir_l, c + dir_c)
+        origem = (l - dir_l, c - dir_c)
+        if not pos_valida(*pouso) or not pos_valida(*origem):
+            continue
+        protecao = _mascara([(l + dir_l, c), (l, c + dir_c)])
+        diagonais.append((BIT[INDICE[pouso]], BIT[INDICE[origem]], INDICE[origem], protecao))
+    return tuple(diagonais)
+
+DIAGONAIS = [_diagonais(l, c) for l, c in CASAS]
+
+def _risco(a, b):
+    (la, ca), (lb, cb) = CASAS[a], CASAS[b]
+    dist = abs(la - lb) + abs(ca - cb)
+    if dist == 0:
+        return 1000
+    if dist <= 1:
+        return 500
+    if dist <= 2:
+        return 200
+    if dist <= 3:
+        return 50
+    return 0
+
+# risco de uma diagonal exposta pela distancia da onca ate a casa de onde ela salta
+RISCO = [[_risco(a, b) for b in range(NUM_CASAS)] for a in range(NUM_CASAS)]
+
+# capturas da onca por (casa da onca, mascara dos caes): (casas atacadas, atacadas por salto
+# diagonal, quantos lances de salto capturam cada casa). Sai dos saltos ja memoizados em
+# bitboard.saltos_onca; limpo quando enche
+CACHE_CAPTURAS = {}
+CACHE_CAPTURAS_MAX = 1 << 16
+
+def capturas(onca, caes):
+    perfil = CACHE_CAPTURAS.get((onca, caes))
+    if perfil is None:
+        atacados = diagonais = 0
+        por_casa = [0] * NUM_CASAS
+        for caminho, _, _ in saltos_onca(onca, caes):
+            for (l1, c1), (l2, c2) in zip(caminho, caminho[1:]):
+                meio = INDICE[((l1 + l2) // 2, (c1 + c2) // 2)]
+                atacados |= BIT[meio]
+                por_casa[meio] += 1
+                if l1 != l2 and c1 != c2:
+                    diagonais |= BIT[meio]
+        perfil = (atacados, diagonais, tuple(por_casa))
+        if len(CACHE_CAPTURAS) >= CACHE_CAPTURAS_MAX:
+            CACHE_CAPTURAS.clear()
+        CACHE_CAPTURAS[(onca, caes)] = perfil
+    return perfil
+
+class MapaAmeacas:
+    __slots__ = ('onca', 'caes', 'ocupadas', 'atacados')
+
+    def __init__(self, onca, caes, atacados):
+        self.onca = onca
+        self.caes = caes
+        self.ocupadas = caes | (BIT[onca] if onca is not None else 0)
+        self.atacados = atacados
+
+    def em_risco(self, i):
+        return self.atacados & BIT[i] != 0
+
+    def suporte(self, i):
+        return (self.caes & VIZINHOS[i]).bit_count()
+
+    def suporte_diagonal(self, i):
+        return (self.caes & VIZINHOS_DIAGONAIS[i]).bit_count()
+
+    def diagonais(self, i):
+        # mesma regra de antes: a diagonal conta se o pouso esta livre e a casa oposta
+        # livre ou com a onca; sem cao adjacente protegendo ela esta exposta
+        risco = expostas = protegidas = 0
+        for pouso, origem, casa_origem, protecao in DIAGONAIS[i]:
+            if self.ocupadas & pouso or self.caes & origem:
+                continue
+            if self.caes & protecao:
+                protegidas += 1
+            else:
+                expostas += 1
+                risco += RISCO[self.onca][casa_origem]
+        return risco, expostas, protegidas
+
+def mapa(board, ameacados):
+    pos = board if type(board) is Posicao else de_tabuleiro(board)
+    onca = pos.onca.bit_length() - 1 if pos.onca else None
+    return MapaAmeacas(onca, pos.caes, ameacados)
@@ -0,0 +1,131 @@
+import argparse, json, os, random, sys, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import minimax as mm
+import ordenacao
+import transposicao
+import avaliacao
+import bitboard
+from busca import busca_iterativa, JANELA_ASPIRACAO
+from main import MAX_PROF, profundidade
+from minimax import minimax, format_move
+from paralelo import _inicializar
+from utils import parse_board_from_lines, RECENT_BOARDS, historico_chave
+
+# analise em lote: le posicoes no formato de texto do controlador (linhas com '#') de um
+# arquivo ou da entrada padrao, busca cada uma num pool de processos e escreve uma linha
+# JSON por posicao, na ordem da entrada. So JANELA posicoes por worker ficam em memoria
+# de cada vez, entao a entrada pode ser maior que a memoria.
+
+LINHAS_TABULEIRO = 9
+JANELA = 4
+
+def posicoes(arquivo, lado_padrao):
+    # uma linha so com "o" ou "c" define o lado a jogar no proximo tabuleiro (e a primeira
+    # linha das mensagens do controlador); sem ela vale lado_padrao
+    lado = lado_padrao
+    linhas = []
+    for linha in arquivo:
+        linha = linha.rstrip("\n")
+        if linha.startswith("#"):
+            linhas.append(linha)
+            if len(linhas) == LINHAS_TABULEIRO:
+                yield lado, parse_board_from_lines(linhas)
+                linhas = []
+                lado = lado_padrao
+        elif linha.strip() in ("o", "c"):
+            lado = linha.strip()
+
+def _analisar(board, lado, prof, tempo, janela, semente, quente):
+    # sem quente a TT e a historia comecam vazias em cada posicao e o resultado nao depende
+    # de quais posicoes o mesmo worker buscou antes (da para comparar versoes linha a linha)
+    RECENT_BOARDS.clear()
+    random.seed(semente)
+    if not quente:
+        if transposicao.TABELA is not None:
+            transposicao.TABELA.limpar()
+        ordenacao.HISTORIA.clear()
+    if transposicao.TABELA is not None:
+        transposicao.TABELA.nova_busca(historico_chave())
+    ordenacao.nova_busca()
+    posicao = bitboard.de_tabuleiro(board)
+    if not bitboard.gerar_movimentos(posicao, lado):
+        return None, None, 0, 0, 0.0
+    nos = mm.NOS
+    inicio = time.perf_counter()
+    if tempo is not None:
+        val, mov, prof = busca_iterativa(posicao, lado == 'o', tempo, prof, janela=janela)
+    else:
+        val, mov = minimax(posicao, prof, lado == 'o')
+    return mov, val, prof, mm.NOS - nos, time.perf_counter() - inicio
+
+def resultado(n, lado, mov, val, prof, nos, segundos):
+    return {
+        "n": n,
+        "lado": lado,
+        "lance": format_move(mov, lado).strip() if mov else None,
+        "valor": val,
+        "prof": prof,
+        "nos": nos,
+        "segundos": round(segundos, 4),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("entrada", nargs="?", default="-", help="arquivo de posicoes; '-' le da entrada padrao")
+    parser.add_argument("-lado", choices=["o", "c"], default="o", help="lado a jogar quando a posicao nao diz")
+    parser.add_argument("-prof", type=int, default=None, help=f"padrao: {MAX_PROF}, ou sem limite com -tempo")
+    parser.add_argument("-tempo", type=float, default=None, help="segundos por posicao (busca iterativa ate -prof)")
+    parser.add_argument("-workers", type=int, default=os.cpu_count())
+    parser.add_argument("-tt", type=int, default=1 << 18)
+    parser.add_argument("-tt-politica", choices=transposicao.POLITICAS, default="profundidade")
+    parser.add_argument("-cache-avaliacao", type=int, default=1 << 16)
+    parser.add_argument("-seguranca", action="store_true")
+    parser.add_argument("-pvs", action="store_true")
+    parser.add_argument("-tablebase", default=None)
+    parser.add_argument("-pesos", default=None)
+    parser.add_argument("-semente", type=int, default=0)
+    # mantem TT e historia entre posicoes do mesmo worker: mais rapido, mas nao reprodutivel
+    parser.add_argument("-quente", action="store_true")
+    parser.add_argument("-saida", default="-")
+    args = parser.parse_args()
+    args.prof = profundidade(args.prof, args.tempo)
+    if args.pesos:
+        avaliacao.carregar_pesos(args.pesos)
+    config = (args.tt, args.tt_politica, args.seguranca, args.tablebase, args.pvs, args.cache_avaliacao,
+              avaliacao.pesos())
+    janela = JANELA_ASPIRACAO if args.pvs else None
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada)
+    saida = sys.stdout if args.saida == "-" else open(args.saida, "w")
+    pendentes = deque()
+    total = nos = 0
+    inicio = time.perf_counter()
+
+    def escrever(n, lado, futuro):
+        nonlocal total, nos
+        r = resultado(n, lado, *futuro.result())
+        saida.write(json.dumps(r) + "\n")
+        saida.flush()
+        total += 1
+        nos += r["nos"]
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_inicializar, initargs=config) as pool:
+            for n, (lado, board) in enumerate(posicoes(entrada, args.lado)):
+                # a mesma semente por posicao: o resultado nao depende de qual worker a pegou
+                pendentes.append((n, lado, pool.submit(_analisar, board, lado, args.prof, args.tempo, janela,
+                                                       args.semente + n, args.quente)))
+                while len(pendentes) >= JANELA * args.workers or (pendentes and pendentes[0][2].done()):
+                    escrever(*pendentes.popleft())
+            while pendentes:
+                escrever(*pendentes.popleft())
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if saida is not sys.stdout:
+            saida.close()
+    segundos = time.perf_counter() - inicio
+    print(f"analisar: {total} posicoes em {segundos:.1f}s, {nos / max(segundos, 1e-9):.0f} nos/s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import mmap, os, struct, zlib
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+from bitboard import codificar_movimento, decodificar_movimento
+
+# armazem persistente: uma tabela de transposicao e um cache de avaliacao em disco, num
+# arquivo de tamanho fixo mapeado em memoria e compartilhado por todos os processos que o
+# abrem (os dois lados, os workers, partidas seguidas).
+#
+# Versao: o cabecalho guarda a assinatura da avaliacao (avaliacao.assinatura(): pesos W_*
+# e avaliacao.VERSAO), e a assinatura entra na verificacao de cada entrada: mudou um peso,
+# tudo que foi gravado antes deixa de conferir e o cabecalho passa a ter a nova assinatura.
+# Processos com pesos diferentes no mesmo arquivo nunca leem as entradas um do outro.
+#
+# Contexto: como na TabelaTransposicao, cada valor fica preso ao historico da partida em que
+# foi calculado (utils.historico_chave), porque a penalidade de repeticao depende dele; de
+# outro contexto so o lance e reaproveitado.
+#
+# Concorrencia: sem trava por entrada. Cada entrada guarda chave ^ assinatura ^ crc32(dados);
+# uma entrada escrita pela metade por outro processo nao confere e vale como vazia. So a
+# criacao do arquivo e a troca do cabecalho sao feitas sob flock.
+MAGICO = b'JOTT'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sHHIIQ')
+TAM_LANCE = 16
+# verificacao, contexto, valor, tipo, profundidade, lance
+ENTRADA = struct.Struct(f'<QqdBB{TAM_LANCE}s6x')
+# verificacao, valor
+AVALIACAO = struct.Struct('<Qd')
+MASCARA = (1 << 64) - 1
+PROF_MINIMA = 3
+
+ARMAZEM = None
+
+def _potencia(n):
+    p = 1
+    while p < n:
+        p <<= 1
+    return p
+
+class Armazem:
+    def __init__(self, caminho, assinatura, entradas=1 << 20, avaliacoes=1 << 20):
+        self.caminho = caminho
+        self.assinatura = assinatura & MASCARA
+        self.entradas = _potencia(entradas)
+        self.avaliacoes = _potencia(avaliacoes)
+        self.inicio_avaliacoes = CABECALHO.size + self.entradas * ENTRADA.size
+        tamanho = self.inicio_avaliacoes + self.avaliacoes * AVALIACAO.size
+        self.arquivo = os.fdopen(os.open(caminho, os.O_RDWR | os.O_CREAT, 0o644), 'r+b')
+        if fcntl is not None:
+            fcntl.flock(self.arquivo, fcntl.LOCK_EX)
+        try:
+            cabecalho = self.arquivo.read(CABECALHO.size)
+            esperado = CABECALHO.pack(MAGICO, VERSAO, 0, self.entradas, self.avaliacoes, self.assinatura)
+            # o arquivo nunca diminui: outro processo pode estar com ele mapeado
+            if os.fstat(self.arquivo.fileno()).st_size < tamanho:
+                self.arquivo.truncate(tamanho)
+            self.invalidado = cabecalho != esperado
+            if self.invalidado:
+                # outro formato ou outros pesos: basta trocar o cabecalho, porque as entradas
+                # antigas nao conferem com a assinatura nova e ficam como vazias
+                self.arquivo.seek(0)
+                self.arquivo.write(esperado)
+                self.arquivo.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self.arquivo, fcntl.LOCK_UN)
+        self.dados = mmap.mmap(self.arquivo.fileno(), tamanho)
+        self.consultas = self.acertos = self.armazenamentos = 0
+        self.consultas_avaliacao = self.acertos_avaliacao = 0
+
+    def _ler(self, chave):
+        pos = CABECALHO.size + (chave & (self.entradas - 1)) * ENTRADA.size
+        bruto = self.dados[pos:pos + ENTRADA.size]
+        verificacao = int.from_bytes(bruto[:8], 'little')
+        if verificacao ^ self.assinatura ^ zlib.crc32(bruto[8:]) != chave:
+            return pos, None
+        return pos, ENTRADA.unpack(bruto)
+
+    def consultar(self, chave, contexto):
+        # mesmo formato de TabelaTransposicao.consultar; de outro contexto so o lance vale
+        self.consultas += 1
+        _, entrada = self._ler(chave)
+        if entrada is None:
+            return None
+        self.acertos += 1
+        _, ctx, val, tipo, prof, lance = entrada
+        mov = decodificar_movimento(lance) if lance[0] else None
+        return val, tipo, prof if ctx == contexto else -1, mov
+
+    def armazenar(self, chave, val, tipo, prof, mov, contexto):
+        # substitui entrada vazia, de outra chave, de outro contexto (so o lance serviria) ou de
+        # busca no maximo tao profunda
+        lance = codificar_movimento(mov) if mov is not None else b''
+        if len(lance) > TAM_LANCE:
+            return
+        pos, antiga = self._ler(chave)
+        if antiga is not None and antiga[1] == contexto and antiga[4] > prof:
+            return
+        self.armazenamentos += 1
+        dados = ENTRADA.pack(0, contexto, val, tipo, prof, lance)[8:]
+        verificacao = chave ^ self.assinatura ^ zlib.crc32(dados)
+        self.dados[pos:pos + ENTRADA.size] = verificacao.to_bytes(8, 'little') + dados
+
+    def avaliacao(self, chave):
+        self.consultas_avaliacao += 1
+        pos = self.inicio_avaliacoes + (chave & (self.avaliacoes - 1)) * AVALIACAO.size
+        bruto = self.dados[pos:pos + AVALIACAO.size]
+        verificacao = int.from_bytes(bruto[:8], 'little')
+        if verificacao ^ self.assinatura ^ zlib.crc32(bruto[8:]) != chave:
+            return None
+        self.acertos_avaliacao += 1
+        return AVALIACAO.unpack(bruto)[1]
+
+    def guardar_avaliacao(self, chave, valor):
+        pos = self.inicio_avaliacoes + (chave & (self.avaliacoes - 1)) * AVALIACAO.size
+        dados = struct.pack('<d', valor)
+        verificacao = chave ^ self.assinatura ^ zlib.crc32(dados)
+        self.dados[pos:pos + AVALIACAO.size] = verificacao.to_bytes(8, 'little') + dados
+
+    def relatorio(self):
+        return {
+            "caminho": self.caminho,
+            "invalidado": self.invalidado,
+            "consultas": self.consultas,
+            "acertos": self.acertos,
+            "taxa_acerto": self.acertos / self.consultas if self.consultas else 0.0,
+            "armazenamentos": self.armazenamentos,
+            "consultas_avaliacao": self.consultas_avaliacao,
+            "taxa_acerto_avaliacao": (self.acertos_avaliacao / self.consultas_avaliacao
+                                      if self.consultas_avaliacao else 0.0),
+        }
+
+    def fechar(self):
+        self.dados.flush()
+        self.dados.close()
+        self.arquivo.close()
+
+def abrir(caminho, assinatura, entradas=1 << 20, avaliacoes=1 << 20):
+    global ARMAZEM
+    fechar()
+    ARMAZEM = Armazem(caminho, assinatura, entradas, avaliacoes)
+    return ARMAZEM
+
+def fechar():
+    global ARMAZEM
+    if ARMAZEM is not None:
+        ARMAZEM.fechar()
+    ARMAZEM = None
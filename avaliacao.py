@@ -1,84 +1,189 @@
-import random
-from movimentos import gerar_movimentos_onca, gerar_movimentos_cachorro, get_cell, pos_valida
-from utils import board_to_key, find_all_pieces, count_pieces
-
-def analisar_vulnerabilidade_diagonal(board, dl, dc, onca_pos):
-    ol, oc = onca_pos
-    risco_total = 0
-    diagonais_expostas = []
-    tem_protecao = {(-1, -1): False, (-1, 1): False, (1, -1): False, (1, 1): False}
-    for dir_l, dir_c in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
-        pouso_l, pouso_c = dl + dir_l, dc + dir_c
-        onca_l, onca_c = dl - dir_l, dc - dir_c
-        if not pos_valida(pouso_l, pouso_c) or not pos_valida(onca_l, onca_c):
-            continue
-        tem_espaco_pouso = get_cell(board, pouso_l, pouso_c) == '-'
-        onca_pode_estar = get_cell(board, onca_l, onca_c) in ['-', 'o']
-        if tem_espaco_pouso and onca_pode_estar:
-            dist_onca = abs(ol - onca_l) + abs(oc - onca_c)
-            cachorro_protegendo = get_cell(board, pouso_l, pouso_c) == 'c'
-            cachorro_adj_diagonal = False
-            for check_l, check_c in [(dl + dir_l, dc), (dl, dc + dir_c)]:
-                if pos_valida(check_l, check_c) and get_cell(board, check_l, check_c) == 'c':
-                    cachorro_adj_diagonal = True
-                    break
-            tem_protecao[(dir_l, dir_c)] = cachorro_protegendo or cachorro_adj_diagonal
-            if not (cachorro_protegendo or cachorro_adj_diagonal):
-                diagonais_expostas.append((dir_l, dir_c))
-                if dist_onca == 0:
-                    risco_total += 1000
-                elif dist_onca <= 1:
-                    risco_total += 500
-                elif dist_onca <= 2:
-                    risco_total += 200
-                elif dist_onca <= 3:
-                    risco_total += 50
-    tem_protecao_adequada = sum(tem_protecao.values()) >= 2
-    return risco_total, diagonais_expostas, tem_protecao_adequada
-
-def avaliar(board, lado_atual):
-    W_CAPTURE = 2000000
-    W_ONCA_MOB = 25
-    W_ONCA_CAPTURE = 150
-    W_CENTER = 5
-    W_DOG_SAFETY = -1500
-    W_DOG_DIAGONAL_RISK = -2000
-    W_DOG_DIAGONAL_EXPOSED = -1800
-    W_DIAGONAL_VULNERABILITY = -1500
-    W_DOG_FORMATION = -500
-    W_ENCIRCLE = -200
-    W_DOG_SUPPORT = -180
-    W_DIAGONAL_SUPPORT = -400
-    W_BLOCK_ESCAPE = -250
-    W_DOG_ADVANCE = -8
-    W_LINE_CONTROL = -150
-    W_CENTER_CONTROL = -200
-    W_WALL_FORMATION = -150
-    W_PREVENT_RETREAT = -300
-    W_DIAGONAL_CHAIN = -300
-    W_REPEAT = -1000000
-    W_RANDOMNESS = 20
-
-    onca, cachorros = None, None
-    onca, cachorros = count_pieces(board, pos_valida, get_cell)
-    captured = 14 - cachorros
-
-    onca_pos = find_all_pieces(board, 'o', pos_valida, get_cell)
-    if not onca_pos:
-        return -99999 if lado_atual == 'o' else 99999
+import hashlib, json, random, sys
+from collections import OrderedDict
+from movimentos import pos_valida
+from bitboard import motor_de, INDICE, BIT
+import ameacas
+from zobrist import hash_tabuleiro, canonica
+import armazem
 
-    ol, oc = onca_pos[0]
-    onca_moves = gerar_movimentos_onca(board)
+W_CAPTURE = 2000000
+W_ONCA_MOB = 25
+W_ONCA_CAPTURE = 150
+W_CENTER = 5
+W_DOG_SAFETY = -1500
+W_DOG_DIAGONAL_RISK = -2000
+W_DOG_DIAGONAL_EXPOSED = -1800
+W_DIAGONAL_VULNERABILITY = -1500
+W_DOG_FORMATION = -500
+W_ENCIRCLE = -200
+W_DOG_SUPPORT = -180
+W_DIAGONAL_SUPPORT = -400
+W_BLOCK_ESCAPE = -250
+W_DOG_ADVANCE = -8
+W_LINE_CONTROL = -150
+W_CENTER_CONTROL = -200
+W_WALL_FORMATION = -150
+W_PREVENT_RETREAT = -300
+W_DIAGONAL_CHAIN = -300
+W_REPEAT = -1000000
+W_RANDOMNESS = 20
+NOMES_PESOS = [nome for nome in globals() if nome.startswith("W_")]
+# mudar quando pontuacao mudar de forma que os pesos nao mostram: invalida o armazem em disco.
+# Desde a versao 1 os saltos sao deduplicados (movimentos.deduplicar_saltos, bitboard.saltos_onca):
+# mobilidade, capturas disponiveis e cerco contam lances distintos, nao caminhos de salto
+VERSAO = 1
+
+def pesos():
+    return {nome: globals()[nome] for nome in NOMES_PESOS}
+
+def aplicar_pesos(novos):
+    # troca os pesos da avaliacao; valores guardados no cache deixam de valer
+    desconhecidos = set(novos) - set(NOMES_PESOS)
+    if desconhecidos:
+        raise ValueError(f"pesos desconhecidos: {sorted(desconhecidos)}")
+    globals().update(novos)
+    if CACHE is not None:
+        CACHE.limpar()
+    atual = armazem.ARMAZEM
+    if atual is not None and atual.assinatura != assinatura():
+        armazem.abrir(atual.caminho, assinatura(), atual.entradas, atual.avaliacoes)
+
+def assinatura():
+    # identifica a funcao de avaliacao (pesos e VERSAO) para o armazem persistente
+    texto = json.dumps({"versao": VERSAO, "pesos": pesos()}, sort_keys=True)
+    return int.from_bytes(hashlib.sha1(texto.encode()).digest()[:8], 'little')
+
+def carregar_pesos(caminho):
+    with open(caminho) as f:
+        aplicar_pesos(json.load(f))
+
+class CacheAvaliacao:
+    # pontuacao da posicao do ponto de vista da onca, sem a penalidade de repeticao (que
+    # depende do historico da partida), por hash canonico; descarta a menos usada (LRU)
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self.entradas = OrderedDict()
+        self.consultas = 0
+        self.acertos = 0
+        self.descartes = 0
+
+    def consultar(self, chave):
+        self.consultas += 1
+        valor = self.entradas.get(chave)
+        if valor is not None:
+            self.acertos += 1
+            self.entradas.move_to_end(chave)
+        return valor
+
+    def armazenar(self, chave, valor):
+        self.entradas[chave] = valor
+        if len(self.entradas) > self.tamanho:
+            self.entradas.popitem(last=False)
+            self.descartes += 1
+
+    def limpar(self):
+        self.entradas.clear()
+
+    def memoria(self):
+        # estimativa em bytes: a tabela do dicionario mais a chave (int) e o valor (float)
+        return sys.getsizeof(self.entradas) + len(self.entradas) * (sys.getsizeof(1 << 63) + sys.getsizeof(0.0))
+
+    def relatorio(self):
+        return {
+            "tamanho": self.tamanho,
+            "ocupacao": len(self.entradas),
+            "consultas": self.consultas,
+            "acertos": self.acertos,
+            "taxa_acerto": self.acertos / self.consultas if self.consultas else 0.0,
+            "descartes": self.descartes,
+            "memoria_kb": self.memoria() // 1024,
+        }
+
+CACHE = None
+
+def configurar_cache(tamanho):
+    global CACHE
+    CACHE = CacheAvaliacao(tamanho) if tamanho > 0 else None
+    return CACHE
+
+def ruido(chave):
+    # termo aleatorio fixo por posicao, para o valor guardado no cache ser o mesmo sempre
+    return ((chave * 0x9E3779B97F4A7C15) & ((1 << 64) - 1)) / (1 << 64) * 2 * W_RANDOMNESS - W_RANDOMNESS
+
+class Analise:
+    # o que a busca e a avaliacao precisam de uma posicao, calculado uma vez por no
+    __slots__ = ('onca_pos', 'dogs_positions', 'onca_moves', 'ameacados', 'capturas_disponiveis')
 
+    def __init__(self, onca_pos, dogs_positions, onca_moves, ameacados, capturas_disponiveis):
+        self.onca_pos = onca_pos
+        self.dogs_positions = dogs_positions
+        self.onca_moves = onca_moves
+        self.ameacados = ameacados
+        self.capturas_disponiveis = capturas_disponiveis
+
+def analisar_posicao(board):
+    motor = motor_de(board)
+    onca_pos = motor.find_all_pieces_local(board, 'o')
+    dogs_positions = motor.find_all_pieces_local(board, 'c')
+    onca_moves = motor.gerar_movimentos_onca(board) if onca_pos else []
+    # mascara das casas de caes que algum salto captura
+    ameacados = 0
     capturas_disponiveis = 0
     for m in onca_moves:
         if len(m) == 3 and m[2] == 'salto_consecutivo':
             caminho = m[0]
             capturas_disponiveis += len(caminho) - 1
-        elif len(m) >=3 and m[2] is not None:
+            for i in range(len(caminho) - 1):
+                l1, c1 = caminho[i]
+                l2, c2 = caminho[i + 1]
+                ameacados |= BIT[INDICE[((l1 + l2) // 2, (c1 + c2) // 2)]]
+        elif len(m) >= 3 and m[2] is not None:
             capturas_disponiveis += 1
+            ameacados |= BIT[INDICE[m[2]]]
+    return Analise(onca_pos, dogs_positions, onca_moves, ameacados, capturas_disponiveis)
+
+def avaliar(board, lado_atual, chave=None, analise=None):
+    from utils import RECENT_BOARDS as RB
+    if chave is None:
+        chave = hash_tabuleiro(board)
+    cache = CACHE
+    score = None
+    if cache is not None:
+        score = cache.consultar(canonica(chave))
+        # o armazem em disco so guarda a pontuacao com o ruido fixo por posicao (com o cache ligado)
+        if score is None and armazem.ARMAZEM is not None:
+            score = armazem.ARMAZEM.avaliacao(canonica(chave))
+            if score is not None:
+                cache.armazenar(canonica(chave), score)
+    if score is None:
+        if analise is None:
+            analise = analisar_posicao(board)
+        if not analise.onca_pos:
+            return -99999 if lado_atual == 'o' else 99999
+        if cache is None:
+            score = pontuacao(board, analise, random.uniform(-W_RANDOMNESS, W_RANDOMNESS))
+        else:
+            score = pontuacao(board, analise, ruido(canonica(chave)))
+            cache.armazenar(canonica(chave), score)
+            if armazem.ARMAZEM is not None:
+                armazem.ARMAZEM.guardar_avaliacao(canonica(chave), score)
+    score += W_REPEAT * RB.count(chave)
+    if lado_atual == 'c':
+        score = -score
+    return score
+
+def pontuacao(board, analise, randomness):
+    get_cell = motor_de(board).get_cell
+    captured = 14 - len(analise.dogs_positions)
+
+    onca_pos = analise.onca_pos
 
-    dogs_positions = find_all_pieces(board, 'c', pos_valida, get_cell)
+    ol, oc = onca_pos[0]
+    onca_moves = analise.onca_moves
+    capturas_disponiveis = analise.capturas_disponiveis
+    mapa = ameacas.mapa(board, analise.ameacados)
+
+    dogs_positions = analise.dogs_positions
     dogs_at_risk = 0
     dogs_with_support = 0
     dogs_isolated = 0
@@ -88,40 +193,15 @@ def avaliar(board, lado_atual):
     dogs_with_diagonal_protection = 0
 
     for dl, dc in dogs_positions:
-        risco_diag, diagonais_exp, protecao_adequada = analisar_vulnerabilidade_diagonal(
-            board, dl, dc, (ol, oc)
-        )
+        i = INDICE[(dl, dc)]
+        risco_diag, expostas, protegidas = mapa.diagonais(i)
         total_diagonal_vulnerability += risco_diag
-        diagonais_expostas_total += len(diagonais_exp)
-        if protecao_adequada:
+        diagonais_expostas_total += expostas
+        if protegidas >= 2:
             dogs_with_diagonal_protection += 1
-        em_risco = False
-        for move in onca_moves:
-            if len(move) == 3 and move[2] == 'salto_consecutivo':
-                caminho = move[0]
-                for i in range(len(caminho) - 1):
-                    l1, c1 = caminho[i]
-                    l2, c2 = caminho[i + 1]
-                    ml, mc = (l1 + l2) // 2, (c1 + c2) // 2
-                    if (ml, mc) == (dl, dc):
-                        em_risco = True
-                        break
-            elif len(move) >=3 and move[2] and move[2] == (dl, dc):
-                em_risco = True
-                break
-        if em_risco:
+        if mapa.em_risco(i):
             dogs_at_risk += 1
-        suporte = 0
-        suporte_diagonal = 0
-        for ddl, ddc in [(-1,0), (1,0), (0,-1), (0,1)]:
-            nl, nc = dl + ddl, dc + ddc
-            if pos_valida(nl, nc) and get_cell(board, nl, nc) == 'c':
-                suporte += 1
-        for ddl, ddc in [(-1,-1), (-1,1), (1,-1), (1,1)]:
-            nl, nc = dl + ddl, dc + ddc
-            if pos_valida(nl, nc) and get_cell(board, nl, nc) == 'c':
-                suporte += 1
-                suporte_diagonal += 1
+        suporte = mapa.suporte(i)
         if suporte >= 3:
             dogs_with_support += 1
         elif suporte == 0:
@@ -142,12 +222,7 @@ def avaliar(board, lado_atual):
 
     diagonal_chain_score = 0
     for dl, dc in dogs_positions:
-        protecoes = 0
-        for ddl, ddc in [(-1,-1), (-1,1), (1,-1), (1,1)]:
-            nl, nc = dl + ddl, dc + ddc
-            if pos_valida(nl, nc) and get_cell(board, nl, nc) == 'c':
-                protecoes += 1
-        diagonal_chain_score += protecoes * 10
+        diagonal_chain_score += mapa.suporte_diagonal(INDICE[(dl, dc)]) * 10
 
     line_control = 0
     for linha in [2, 3, 4]:
@@ -191,12 +266,6 @@ def avaliar(board, lado_atual):
     center_dist = abs(ol - 4) + abs(oc - 3)
     centrality = max(0, 6 - center_dist)
     dogs_advancement = sum(dl for dl, dc in dogs_positions)
-    from utils import RECENT_BOARDS as RB
-    key = board_to_key(board)
-    repeat_count = RB.count(key)
-    repeat_penalty = W_REPEAT * repeat_count
-    randomness = random.uniform(-W_RANDOMNESS, W_RANDOMNESS)
-
     score = 0
     score += captured * W_CAPTURE
     score += len(onca_moves) * W_ONCA_MOB
@@ -218,8 +287,5 @@ def avaliar(board, lado_atual):
     score += center_control * W_CENTER_CONTROL
     score += wall_formation * W_WALL_FORMATION
     score += prevent_retreat * W_PREVENT_RETREAT
-    score += repeat_penalty
     score += randomness
-    if lado_atual == 'c':
-        score = -score
     return score
@@ -0,0 +1,140 @@
+import argparse, json, os, subprocess, time
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+import minimax as mm
+import bitboard
+from busca import buscar_com_janela, JANELA_ASPIRACAO
+from simulador import Jogador, jogar_partida, reiniciar_estado
+
+# posicoes fixas (lado a mover, linhas 1 a 7); nao mudar sem zerar o historico de resultados
+POSICOES = [
+    ('o', ['#ccccc#', '#ccccc#', '#ccocc#', '#-----#', '#-----#', '# --- #', '#- - -#']),
+    ('c', ['#ccccc#', '#ccccc#', '#-c--c#', '#--cc-#', '#----o#', '# --- #', '#- - -#']),
+    ('o', ['#ccccc#', '#ccccc#', '#---cc#', '#c----#', '#-co--#', '# --- #', '#- - -#']),
+    ('c', ['#cc-cc#', '#cccc-#', '#c-cc-#', '#-c--c#', '#-c---#', '# --- #', '#- - o#']),
+    ('o', ['#ccccc#', '#c-ccc#', '#c-c-c#', '#---c-#', '#c----#', '# --o #', '#- - -#']),
+    ('c', ['#cc-cc#', '#-c-c-#', '#ccccc#', '#c----#', '#c-o-c#', '# --- #', '#- - -#']),
+    ('o', ['#--ccc#', '#cc-c-#', '#ccccc#', '#----o#', '#ccc--#', '# --- #', '#- - -#']),
+    ('c', ['#cc--c#', '#co-cc#', '#c----#', '#c--c-#', '#c---c#', '# --- #', '#- - -#']),
+    ('o', ['#cc-cc#', '#c-c-c#', '#c--cc#', '#-c---#', '#c-o--#', '# --- #', '#- - -#']),
+    ('c', ['#cccc-#', '#c--cc#', '#--ccc#', '#cc-c-#', '#-c---#', '# --- #', '#- - o#']),
+]
+
+def tabuleiro(linhas):
+    return [list("#######")] + [list(linha) for linha in linhas] + [list("#######")]
+
+def medir_busca(prof, tt, motor="bitboard", pvs=False):
+    # aprofunda cada posicao de 1 ate prof, como a busca iterativa, sem limite de tempo;
+    # com pvs liga tambem a janela de aspiracao
+    mm.PVS = pvs
+    janela = JANELA_ASPIRACAO if pvs else None
+    tempos = [0.0] * prof
+    nos = 0
+    for lado, linhas in POSICOES:
+        reiniciar_estado(tt)
+        board = tabuleiro(linhas)
+        if motor == "bitboard":
+            board = bitboard.de_tabuleiro(board)
+        mov = None
+        valores = {}
+        nos_inicio = mm.NOS
+        inicio = time.perf_counter()
+        for p in range(1, prof + 1):
+            valores[p], mov = buscar_com_janela(board, p, lado == 'o', valores.get(p - 2), janela, mov)
+            tempos[p - 1] += time.perf_counter() - inicio
+        nos += mm.NOS - nos_inicio
+    mm.PVS = False
+    total = tempos[-1]
+    return {
+        "nos": nos,
+        "nos_por_segundo": nos / total if total else 0.0,
+        "tempo_ate_profundidade": [round(t, 4) for t in tempos],
+    }
+
+def medir_partidas(partidas, prof, tt):
+    jogadas = 0
+    vencedores = {'o': 0, 'c': 0, 'empate': 0}
+    for semente in range(partidas):
+        partida = jogar_partida(Jogador('o', prof, tt=tt), Jogador('c', prof, tt=tt), semente)
+        jogadas += partida["jogadas"]
+        vencedores[partida["vencedor"] or 'empate'] += 1
+    return {"jogadas_por_partida": jogadas / partidas if partidas else 0.0, "vencedores": vencedores}
+
+def versao():
+    try:
+        saida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+        return saida.stdout.strip() or "desconhecida"
+    except OSError:
+        return "desconhecida"
+
+def anterior(caminho, parametros):
+    if not os.path.exists(caminho):
+        return None
+    ultimo = None
+    with open(caminho) as f:
+        for linha in f:
+            registro = json.loads(linha)
+            if registro.get("parametros") == parametros:
+                ultimo = registro
+    return ultimo
+
+def comparar(antes, depois, tolerancia):
+    avisos = []
+    if depois["busca"]["nos_por_segundo"] < antes["busca"]["nos_por_segundo"] * (1 - tolerancia):
+        avisos.append(f"nos/s caiu de {antes['busca']['nos_por_segundo']:.0f} "
+                      f"para {depois['busca']['nos_por_segundo']:.0f}")
+    t_antes = antes["busca"]["tempo_ate_profundidade"][-1]
+    t_depois = depois["busca"]["tempo_ate_profundidade"][-1]
+    if t_depois > t_antes * (1 + tolerancia):
+        avisos.append(f"tempo ate a profundidade subiu de {t_antes:.2f}s para {t_depois:.2f}s")
+    if depois["memoria_pico_kb"] > antes["memoria_pico_kb"] * (1 + tolerancia):
+        avisos.append(f"pico de memoria subiu de {antes['memoria_pico_kb']} para {depois['memoria_pico_kb']} KB")
+    return avisos
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-prof", type=int, default=5)
+    parser.add_argument("-tt", type=int, default=1 << 18)
+    parser.add_argument("-motor", choices=["lista", "bitboard"], default="bitboard")
+    parser.add_argument("-partidas", type=int, default=2)
+    parser.add_argument("-prof-partidas", type=int, default=3)
+    parser.add_argument("-saida", default="benchmark.jsonl")
+    parser.add_argument("-tolerancia", type=float, default=0.10)
+    parser.add_argument("-pvs", action="store_true")
+    # so mede a busca com e sem PVS/aspiracao e mostra a reducao de nos
+    parser.add_argument("-comparar-pvs", action="store_true")
+    args = parser.parse_args()
+    if args.comparar_pvs:
+        sem = medir_busca(args.prof, args.tt, args.motor)
+        com = medir_busca(args.prof, args.tt, args.motor, pvs=True)
+        print(json.dumps({"alfa_beta": sem, "pvs": com,
+                          "reducao_nos": 1 - com["nos"] / sem["nos"]}, indent=2))
+        return
+    parametros = {"prof": args.prof, "tt": args.tt, "motor": args.motor,
+                  "partidas": args.partidas, "prof_partidas": args.prof_partidas}
+    if args.pvs:
+        parametros["pvs"] = True
+    registro = {
+        "versao": versao(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parametros": parametros,
+        "busca": medir_busca(args.prof, args.tt, args.motor, args.pvs),
+        "partidas": medir_partidas(args.partidas, args.prof_partidas, args.tt),
+        "memoria_pico_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0,
+    }
+    print(json.dumps(registro, indent=2))
+    antes = anterior(args.saida, parametros)
+    if antes is not None:
+        avisos = comparar(antes, registro, args.tolerancia)
+        for aviso in avisos:
+            print(f"regressao em relacao a {antes['versao']}: {aviso}")
+        if not avisos:
+            print(f"sem regressao em relacao a {antes['versao']}")
+    with open(args.saida, "a") as f:
+        f.write(json.dumps(registro) + "\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+import sys
+import movimentos
+from movimentos import pos_valida, mov_possivel
+
+# casas validas em ordem de linha/coluna; o bit i de uma mascara e a casa CASAS[i]
+CASAS = [(l, c) for l in range(1, 8) for c in range(1, 6) if pos_valida(l, c)]
+NUM_CASAS = len(CASAS)
+INDICE = {casa: i for i, casa in enumerate(CASAS)}
+BIT = [1 << i for i in range(NUM_CASAS)]
+TODAS = (1 << NUM_CASAS) - 1
+
+DIRECOES_ONCA = [(dl, dc) for dl in [-1, 0, 1] for dc in [-1, 0, 1] if dl or dc]
+DIRECOES_CAO = [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)]
+DIRECOES_SALTO = [(-2, 0), (2, 0), (0, -2), (0, 2), (-2, -2), (-2, 2), (2, -2), (2, 2)]
+
+def _tabela_passos(direcoes):
+    tabela = []
+    for l, c in CASAS:
+        destinos = []
+        for dl, dc in direcoes:
+            ld, cd = l + dl, c + dc
+            if pos_valida(ld, cd) and mov_possivel('m', l, c, ld, cd):
+                destinos.append(INDICE[(ld, cd)])
+        tabela.append(tuple(destinos))
+    return tabela
+
+def _tabela_saltos():
+    tabela = []
+    for l, c in CASAS:
+        saltos = []
+        candidatos = [(dl, dc) for dl, dc in DIRECOES_SALTO]
+        if l == 7:
+            candidatos += [(0, -4), (0, 4)]
+        for dl, dc in candidatos:
+            ld, cd = l + dl, c + dc
+            ml, mc = l + dl // 2, c + dc // 2
+            if not pos_valida(ld, cd) or not pos_valida(ml, mc):
+                continue
+            if mov_possivel('s', l, c, ld, cd):
+                saltos.append((INDICE[(ml, mc)], INDICE[(ld, cd)]))
+        tabela.append(tuple(saltos))
+    return tabela
+
+PASSOS_ONCA = _tabela_passos(DIRECOES_ONCA)
+PASSOS_CAO = _tabela_passos(DIRECOES_CAO)
+SALTOS = _tabela_saltos()
+
+# simetria esquerda/direita do tabuleiro (coluna c <-> 6 - c), inclusive nas linhas 6-7
+ESPELHO = [INDICE[(l, 6 - c)] for l, c in CASAS]
+
+def espelhar_mascara(mascara):
+    m = 0
+    while mascara:
+        b = mascara & -mascara
+        m |= BIT[ESPELHO[b.bit_length() - 1]]
+        mascara ^= b
+    return m
+
+class Posicao:
+    __slots__ = ('onca', 'caes')
+
+    def __init__(self, onca=0, caes=0):
+        self.onca = onca
+        self.caes = caes
+
+    def copia(self):
+        return Posicao(self.onca, self.caes)
+
+    def __eq__(self, outra):
+        return isinstance(outra, Posicao) and self.onca == outra.onca and self.caes == outra.caes
+
+    def __hash__(self):
+        return hash((self.onca, self.caes))
+
+    def __repr__(self):
+        return f"Posicao(onca={self.onca:#x}, caes={self.caes:#x})"
+
+def de_tabuleiro(board):
+    onca = caes = 0
+    for i, (l, c) in enumerate(CASAS):
+        peca = board[l][c]
+        if peca == 'o':
+            onca |= BIT[i]
+        elif peca == 'c':
+            caes |= BIT[i]
+    return Posicao(onca, caes)
+
+def para_tabuleiro(pos):
+    board = [['#'] * 7 for _ in range(9)]
+    for l in range(1, 8):
+        for c in range(1, 6):
+            board[l][c] = get_cell(pos, l, c) if pos_valida(l, c) else ' '
+    return board
+
+def bits(mascara):
+    while mascara:
+        b = mascara & -mascara
+        yield b.bit_length() - 1
+        mascara ^= b
+
+def get_cell(pos, l, c):
+    i = INDICE.get((l, c))
+    if i is None:
+        return '#'
+    b = BIT[i]
+    if pos.onca & b:
+        return 'o'
+    if pos.caes & b:
+        return 'c'
+    return '-'
+
+def set_cell(pos, l, c, value):
+    i = INDICE.get((l, c))
+    if i is None:
+        return
+    b = BIT[i]
+    pos.onca &= ~b
+    pos.caes &= ~b
+    if value == 'o':
+        pos.onca |= b
+    elif value == 'c':
+        pos.caes |= b
+
+def find_all_pieces_local(pos, piece):
+    mascara = pos.onca if piece == 'o' else pos.caes if piece == 'c' else TODAS & ~(pos.onca | pos.caes)
+    return [CASAS[i] for i in bits(mascara)]
+
+def count_pieces(pos):
+    return pos.onca.bit_count(), pos.caes.bit_count()
+
+def gerar_movimentos_cachorro(pos):
+    moves = []
+    ocupadas = pos.onca | pos.caes
+    for i in bits(pos.caes):
+        origem = CASAS[i]
+        for j in PASSOS_CAO[i]:
+            if not ocupadas & BIT[j]:
+                moves.append((origem, CASAS[j], None))
+    return moves
+
+# lances de salto da onca por (casa, mascara dos caes); limpo quando enche
+CACHE_SALTOS = {}
+CACHE_SALTOS_MAX = 1 << 16
+
+def _saltos(i, caes, caminho, finais):
+    folha = True
+    for meio, destino in SALTOS[i]:
+        if caes & BIT[meio] and not caes & BIT[destino]:
+            folha = False
+            caminho.append(CASAS[destino])
+            _saltos(destino, caes & ~BIT[meio], caminho, finais)
+            caminho.pop()
+    if folha and len(caminho) > 1:
+        # ordens diferentes que capturam os mesmos caes e param na mesma casa sao o
+        # mesmo lance; fica o menor caminho (o mesmo que o motor de listas escolhe)
+        atual = finais.get((i, caes))
+        if atual is None or caminho < atual:
+            finais[(i, caes)] = list(caminho)
+
+def saltos_onca(i, caes):
+    moves = CACHE_SALTOS.get((i, caes))
+    if moves is None:
+        finais = {}
+        _saltos(i, caes, [CASAS[i]], finais)
+        moves = tuple((caminho, None, 'salto_consecutivo') for caminho in finais.values())
+        if len(CACHE_SALTOS) >= CACHE_SALTOS_MAX:
+            CACHE_SALTOS.clear()
+        CACHE_SALTOS[(i, caes)] = moves
+    return moves
+
+def gerar_saltos_consecutivos(pos, l, c):
+    return [mov[0] for mov in saltos_onca(INDICE[(l, c)], pos.caes)]
+
+def gerar_movimentos_onca(pos):
+    moves = []
+    if not pos.onca:
+        return moves
+    i = (pos.onca & -pos.onca).bit_length() - 1
+    origem = CASAS[i]
+    ocupadas = pos.onca | pos.caes
+    for j in PASSOS_ONCA[i]:
+        if not ocupadas & BIT[j]:
+            moves.append((origem, CASAS[j], None))
+    moves.extend(saltos_onca(i, pos.caes))
+    return moves
+
+def gerar_movimentos(pos, lado):
+    if lado == 'c':
+        return gerar_movimentos_cachorro(pos)
+    else:
+        return gerar_movimentos_onca(pos)
+
+def fazer_movimento(pos, mov):
+    desfazer = (pos.onca, pos.caes)
+    onca, caes = desfazer
+    if len(mov) == 3 and mov[2] == 'salto_consecutivo':
+        caminho = mov[0]
+        for i in range(len(caminho) - 1):
+            (l1, c1), (l2, c2) = caminho[i], caminho[i + 1]
+            caes &= ~BIT[INDICE[((l1 + l2) // 2, (c1 + c2) // 2)]]
+        onca = BIT[INDICE[caminho[-1]]]
+    else:
+        origem, destino, captura = mov
+        bo, bd = BIT[INDICE[origem]], BIT[INDICE[destino]]
+        if onca & bo:
+            onca = (onca & ~bo) | bd
+        else:
+            caes = (caes & ~bo) | bd
+        if captura:
+            caes &= ~BIT[INDICE[captura]]
+    pos.onca, pos.caes = onca, caes
+    return desfazer
+
+def desfazer_movimento(pos, desfazer):
+    pos.onca, pos.caes = desfazer
+
+def aplicar_movimento(pos, mov):
+    p2 = pos.copia()
+    fazer_movimento(p2, mov)
+    return p2
+
+def espelhar(board):
+    if type(board) is Posicao:
+        return Posicao(espelhar_mascara(board.onca), espelhar_mascara(board.caes))
+    return [linha[::-1] for linha in board]
+
+def espelhar_movimento(mov):
+    if len(mov) == 3 and mov[2] == 'salto_consecutivo':
+        return ([(l, 6 - c) for l, c in mov[0]], None, 'salto_consecutivo')
+    (l1, c1), (l2, c2), captura = mov
+    return ((l1, 6 - c1), (l2, 6 - c2), (captura[0], 6 - captura[1]) if captura else captura)
+
+def codificar_movimento(mov):
+    # casas do lance como indices, precedidas da quantidade; o bit alto marca salto
+    if len(mov) == 3 and mov[2] == 'salto_consecutivo':
+        caminho = mov[0]
+        return bytes([0x80 | len(caminho)] + [INDICE[casa] for casa in caminho])
+    return bytes([2, INDICE[mov[0]], INDICE[mov[1]]])
+
+def decodificar_movimento(dados):
+    casas = [CASAS[i] for i in dados[1:1 + (dados[0] & 0x7f)]]
+    if dados[0] & 0x80:
+        return (casas, None, 'salto_consecutivo')
+    return (casas[0], casas[1], None)
+
+_ESTE = sys.modules[__name__]
+
+def motor_de(board):
+    return _ESTE if type(board) is Posicao else movimentos
@@ -0,0 +1,61 @@
+import math, time
+import minimax as mm
+from minimax import minimax, TempoEsgotado
+from bitboard import Posicao
+from paralelo import minimax_paralelo
+
+PROF_MAXIMA = 64
+# meia largura inicial da janela de aspiracao; a cada falha o lado que falhou cresce
+# FATOR_JANELA vezes e, passando de JANELA_MAXIMA, vira infinito
+JANELA_ASPIRACAO = 100000
+FATOR_JANELA = 4
+JANELA_MAXIMA = 10000000
+
+def copia_tabuleiro(board):
+    if type(board) is Posicao:
+        return board.copia()
+    return [linha[:] for linha in board]
+
+def buscar_com_janela(board, prof, maximizando, centro, janela, primeiro=None):
+    # a folha e avaliada do ponto de vista de quem move, entao o valor oscila com a
+    # paridade da profundidade: o centro deve vir da iteracao prof - 2, nao da anterior
+    if janela is None or centro is None or math.isinf(centro):
+        return minimax(copia_tabuleiro(board), prof, maximizando, primeiro=primeiro)
+    baixo = alto = janela
+    while True:
+        alpha, beta = centro - baixo, centro + alto
+        val, mov = minimax(copia_tabuleiro(board), prof, maximizando, alpha, beta, primeiro=primeiro)
+        if val <= alpha:
+            baixo = math.inf if baixo * FATOR_JANELA > JANELA_MAXIMA else baixo * FATOR_JANELA
+        elif val >= beta:
+            alto = math.inf if alto * FATOR_JANELA > JANELA_MAXIMA else alto * FATOR_JANELA
+        else:
+            return val, mov
+
+def busca_iterativa(board, maximizando, tempo, prof_max=PROF_MAXIMA, workers=1, janela=None):
+    # a profundidade 1 roda sem prazo para sempre haver um lance; as seguintes sao
+    # abortadas quando o prazo vence e o resultado parcial e descartado
+    inicio = time.monotonic()
+    val, mov = minimax(copia_tabuleiro(board), 1, maximizando)
+    prof_completa = 1
+    valores = {1: val}
+    mm.PRAZO = inicio + tempo
+    try:
+        for prof in range(2, prof_max + 1):
+            if mov is None:
+                break
+            try:
+                if workers > 1:
+                    v, m = minimax_paralelo(copia_tabuleiro(board), prof, maximizando, workers, primeiro=mov)
+                else:
+                    v, m = buscar_com_janela(board, prof, maximizando, valores.get(prof - 2), janela, mov)
+            except TempoEsgotado:
+                break
+            val, mov, prof_completa = v, m, prof
+            valores[prof] = val
+            # a proxima iteracao custa bem mais que esta; nao vale comecar sem tempo
+            if time.monotonic() - inicio > tempo / 2:
+                break
+    finally:
+        mm.PRAZO = None
+    return val, mov, prof_completa
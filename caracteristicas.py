@@ -0,0 +1,174 @@
+import numpy as np
+import avaliacao
+import ameacas
+from movimentos import pos_valida
+from bitboard import CASAS, INDICE, NUM_CASAS, PASSOS_ONCA, SALTOS, Posicao, de_tabuleiro
+
+# as mesmas grandezas de avaliacao.pontuacao, calculadas para um lote de posicoes com
+# operacoes de array. Uma posicao e uma linha de NUM_CASAS casas (0 vazia, 1 cao, 2 onca);
+# a coluna j da matriz de caracteristicas multiplica o peso PESOS[j], de modo que
+# caracteristicas @ pesos == pontuacao sem o ruido
+
+VAZIA, CAO, ONCA = 0, 1, 2
+PESOS = [nome for nome in avaliacao.NOMES_PESOS if nome not in ("W_REPEAT", "W_RANDOMNESS")]
+COLUNA = {nome: j for j, nome in enumerate(PESOS)}
+BLOCO = 1 << 15
+
+# a casa NUM_CASAS e uma sentinela usada para completar as tabelas de tamanho variavel
+SENTINELA = NUM_CASAS
+LINHA = np.array([l for l, c in CASAS], dtype=np.float64)
+COLUNA_CASA = np.array([c for l, c in CASAS], dtype=np.float64)
+BITS = np.array([1 << i for i in range(NUM_CASAS)] + [0], dtype=np.int64)
+
+def _completar(listas, largura):
+    return np.array([list(x) + [SENTINELA] * (largura - len(x)) for x in listas], dtype=np.int64)
+
+def _casas(mascara):
+    return [i for i in range(NUM_CASAS) if mascara >> i & 1]
+
+def _adjacencia(mascaras):
+    m = np.zeros((NUM_CASAS, NUM_CASAS), dtype=np.float32)
+    for i, mascara in enumerate(mascaras):
+        m[i, _casas(mascara)] = 1
+    return m
+
+PASSOS = _completar(PASSOS_ONCA, 8)
+SALTO_MEIO = _completar([[m for m, d in s] for s in SALTOS], 8)
+SALTO_DESTINO = _completar([[d for m, d in s] for s in SALTOS], 8)
+VIZINHOS = _adjacencia(ameacas.VIZINHOS)
+VIZINHOS_DIAGONAIS = _adjacencia(ameacas.VIZINHOS_DIAGONAIS)
+VIZINHOS_ORTOGONAIS = _adjacencia(ameacas.VIZINHOS_ORTOGONAIS)
+# vizinhas da onca em que avaliacao procura rotas de fuga (so pos_valida, sem as linhas do tabuleiro)
+FUGAS = _completar([[INDICE[(l + dl, c + dc)] for dl in (-1, 0, 1) for dc in (-1, 0, 1)
+                     if (dl or dc) and pos_valida(l + dl, c + dc)] for l, c in CASAS], 8)
+DIAG_POUSO = _completar([[d[0].bit_length() - 1 for d in ds] for ds in ameacas.DIAGONAIS], 4)
+DIAG_ORIGEM = _completar([[d[2] for d in ds] for ds in ameacas.DIAGONAIS], 4)
+# as (ate duas) casas adjacentes que protegem cada diagonal
+DIAG_PROTECAO = [_completar([[(_casas(d[3]) + [SENTINELA, SENTINELA])[k] for d in ds] for ds in ameacas.DIAGONAIS], 4)
+                 for k in (0, 1)]
+RISCO = np.zeros((NUM_CASAS, NUM_CASAS + 1), dtype=np.float64)
+RISCO[:, :NUM_CASAS] = ameacas.RISCO
+CENTRALIDADE = np.array([max(0, 6 - (abs(l - 4) + abs(c - 3))) for l, c in CASAS], dtype=np.float64)
+CONTROLE_LINHA = np.array([5 - abs(l - 3) if l in (2, 3, 4) else 0 for l, c in CASAS], dtype=np.float64)
+CONTROLE_CENTRO = np.array([10 if c == 3 else 5 if c in (2, 4) else 0 for l, c in CASAS], dtype=np.float64)
+RECUO = np.array([(4 - l) * 30 if l <= 3 else 0 for l, c in CASAS], dtype=np.float64)
+LINHAS_MURO = np.array([[l == linha for l, c in CASAS] for linha in range(2, 6)], dtype=np.float32).T
+
+def codificar(boards):
+    # tabuleiros (listas ou Posicao) para a matriz de casas
+    x = np.zeros((len(boards), NUM_CASAS), dtype=np.int8)
+    for n, board in enumerate(boards):
+        pos = board if type(board) is Posicao else de_tabuleiro(board)
+        x[n] = de_mascaras(np.array([pos.onca]), np.array([pos.caes]))[0]
+    return x
+
+def de_mascaras(onca, caes):
+    # mascaras de bits (bitboard.Posicao) para a matriz de casas
+    onca = np.asarray(onca, dtype=np.int64)[:, None]
+    caes = np.asarray(caes, dtype=np.int64)[:, None]
+    return (((caes & BITS[:NUM_CASAS]) != 0) * CAO + ((onca & BITS[:NUM_CASAS]) != 0) * ONCA).astype(np.int8)
+
+def _saltos(onca, caes):
+    # saltos da onca de todas as posicoes de uma vez: cada estado (linha, casa, caes restantes)
+    # e expandido por todas as direcoes; estados repetidos sao fundidos, como em
+    # bitboard.saltos_onca, e os que nao saltam mais sao os lances de salto
+    n = len(onca)
+    linha, casa, restantes = np.arange(n), onca, caes
+    folhas_linha, folhas_caes = [], []
+    primeiro = True
+    while len(linha):
+        meio, destino = SALTO_MEIO[casa], SALTO_DESTINO[casa]
+        pode = ((restantes[:, None] & BITS[meio]) != 0) & ((restantes[:, None] & BITS[destino]) == 0)
+        if not primeiro:
+            parou = ~pode.any(axis=1)
+            folhas_linha.append(linha[parou])
+            folhas_caes.append(restantes[parou])
+        primeiro = False
+        r, k = np.nonzero(pode)
+        chave = np.unique((linha[r] << 36) | (destino[r, k] << 31) | (restantes[r] & ~BITS[meio[r, k]]))
+        linha, casa, restantes = chave >> 36, (chave >> 31) & 31, chave & ((1 << 31) - 1)
+    folhas_linha = np.concatenate(folhas_linha) if folhas_linha else np.zeros(0, dtype=np.int64)
+    folhas_caes = np.concatenate(folhas_caes) if folhas_caes else np.zeros(0, dtype=np.int64)
+    capturados = caes[folhas_linha] & ~folhas_caes
+    quantidade = np.bincount(folhas_linha, minlength=n)
+    capturas = np.bincount(folhas_linha, weights=np.bitwise_count(capturados), minlength=n)
+    ameacados = np.zeros(n, dtype=np.int64)
+    np.bitwise_or.at(ameacados, folhas_linha, capturados)
+    return quantidade, capturas, ameacados
+
+def _bloco(x):
+    n = len(x)
+    caes_b = x == CAO
+    onca = np.argmax(x == ONCA, axis=1)
+    caes = (caes_b * BITS[:NUM_CASAS]).sum(axis=1)
+    ocupadas = np.concatenate([x != VAZIA, np.ones((n, 1), dtype=bool)], axis=1)
+    caes_s = np.concatenate([caes_b, np.zeros((n, 1), dtype=bool)], axis=1)
+    linhas = np.arange(n)[:, None]
+    caes_f = caes_b.astype(np.float32)
+    num_caes = caes_b.sum(axis=1)
+
+    saltos, capturas, ameacados = _saltos(onca, caes)
+    passos = (~ocupadas[linhas, PASSOS[onca]]).sum(axis=1)
+    mobilidade = passos + saltos
+
+    suporte = caes_f @ VIZINHOS
+    apoiados = (caes_b & (suporte >= 3)).sum(axis=1)
+    isolados = (caes_b & (suporte == 0)).sum(axis=1)
+    em_risco = np.bitwise_count(ameacados)
+
+    # diagonais de cada cao: (n, casa, diagonal)
+    livre = ~ocupadas[:, DIAG_POUSO] & ~caes_s[:, DIAG_ORIGEM] & caes_b[:, :, None]
+    protegida = caes_s[:, DIAG_PROTECAO[0]] | caes_s[:, DIAG_PROTECAO[1]]
+    expostas = livre & ~protegida
+    protegidas = (livre & protegida).sum(axis=2)
+    risco = (expostas * RISCO[onca[:, None, None], DIAG_ORIGEM[None]]).sum(axis=(1, 2))
+
+    com_caes = num_caes > 0
+    divisor = np.maximum(num_caes, 1)
+    media_l = (caes_b * LINHA).sum(axis=1) / divisor
+    media_c = (caes_b * COLUNA_CASA).sum(axis=1) / divisor
+    desvio = np.abs(LINHA - media_l[:, None]) + np.abs(COLUNA_CASA - media_c[:, None])
+    # somada casa a casa na ordem de pontuacao: a soma em pares do NumPy arredonda diferente
+    # e troca o lado de dispersao < 8 em algumas posicoes
+    dispersao = np.zeros(n)
+    for i in range(NUM_CASAS):
+        dispersao += np.where(caes_b[:, i], desvio[:, i], 0.0)
+    formacao = np.where(com_caes, -dispersao + 200 * (dispersao < 8) + 50 * ((media_l >= 3.0) & (media_l <= 4.5)), 0)
+
+    por_linha = caes_f @ LINHAS_MURO
+    muro = (20 * por_linha * (por_linha >= 3)).sum(axis=1)
+    bloqueada = np.concatenate([(caes_f @ VIZINHOS_ORTOGONAIS) > 0, np.ones((n, 1), dtype=bool)], axis=1)
+    fugas = FUGAS[onca]
+    rotas = (~ocupadas[linhas, fugas] & ~bloqueada[linhas, fugas]).sum(axis=1)
+
+    f = np.zeros((n, len(PESOS)))
+    f[:, COLUNA["W_CAPTURE"]] = 14 - num_caes
+    f[:, COLUNA["W_ONCA_MOB"]] = mobilidade
+    f[:, COLUNA["W_ONCA_CAPTURE"]] = capturas
+    f[:, COLUNA["W_CENTER"]] = CENTRALIDADE[onca]
+    f[:, COLUNA["W_DOG_SAFETY"]] = em_risco + 0.8 * isolados
+    f[:, COLUNA["W_DOG_DIAGONAL_EXPOSED"]] = expostas.sum(axis=(1, 2))
+    f[:, COLUNA["W_DIAGONAL_VULNERABILITY"]] = risco
+    f[:, COLUNA["W_DOG_FORMATION"]] = formacao
+    f[:, COLUNA["W_ENCIRCLE"]] = 14 - mobilidade
+    f[:, COLUNA["W_DOG_SUPPORT"]] = apoiados
+    f[:, COLUNA["W_DIAGONAL_SUPPORT"]] = (caes_b & (protegidas >= 2)).sum(axis=1)
+    f[:, COLUNA["W_BLOCK_ESCAPE"]] = -rotas
+    f[:, COLUNA["W_DOG_ADVANCE"]] = (caes_b * LINHA).sum(axis=1)
+    f[:, COLUNA["W_LINE_CONTROL"]] = (caes_b * CONTROLE_LINHA).sum(axis=1)
+    f[:, COLUNA["W_CENTER_CONTROL"]] = (caes_b * CONTROLE_CENTRO).sum(axis=1)
+    f[:, COLUNA["W_WALL_FORMATION"]] = muro
+    f[:, COLUNA["W_PREVENT_RETREAT"]] = RECUO[onca]
+    f[:, COLUNA["W_DIAGONAL_CHAIN"]] = 10 * (caes_f * (caes_f @ VIZINHOS_DIAGONAIS)).sum(axis=1)
+    return f
+
+def extrair(x):
+    # matriz de caracteristicas (n, len(PESOS)) para posicoes com onca
+    x = np.asarray(x, dtype=np.int8)
+    if not len(x):
+        return np.zeros((0, len(PESOS)))
+    return np.concatenate([_bloco(x[i:i + BLOCO]) for i in range(0, len(x), BLOCO)])
+
+def vetor_pesos(pesos=None):
+    pesos = avaliacao.pesos() if pesos is None else pesos
+    return np.array([pesos[nome] for nome in PESOS], dtype=np.float64)
@@ -0,0 +1,172 @@
+import argparse, json, math, mmap, os, struct, time
+from collections import namedtuple
+import minimax as mm
+import avaliacao
+from bitboard import Posicao, de_tabuleiro, codificar_movimento, decodificar_movimento
+from minimax import minimax
+from simulador import reiniciar_estado
+
+# gravacao binaria de partidas: cabecalho e registros de tamanho fixo, so acrescentados.
+# Cada lance jogado e um registro com as mascaras da posicao antes dele, o lado, o lance
+# (bitboard.codificar_movimento), o valor da busca, a profundidade, os nos e o tempo.
+# INICIO e FIM delimitam as partidas; o FIM leva o vencedor ('o', 'c' ou '-' empate).
+MAGICO = b'JOGR'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sHH')
+TAM_LANCE = 16
+REGISTRO = struct.Struct(f'<BcBcIIIdf{TAM_LANCE}s')
+INICIO, LANCE, FIM = 0, 1, 2
+EMPATE = b'-'
+
+Jogada = namedtuple('Jogada', 'tipo lado prof resultado onca caes nos valor segundos lance')
+
+class Gravador:
+    def __init__(self, caminho):
+        self.arquivo = open(caminho, 'ab')
+        if self.arquivo.tell() == 0:
+            self.arquivo.write(CABECALHO.pack(MAGICO, VERSAO, REGISTRO.size))
+        self.nova_partida()
+
+    def nova_partida(self):
+        # lances gravados desde o ultimo INICIO
+        self.lances = 0
+        self._escrever(INICIO, b'-', 0, b'-', 0, 0, 0, math.nan, 0.0, b'')
+
+    def _escrever(self, *campos):
+        # um write por registro e flush: o que ja foi jogado sobrevive a queda do processo
+        self.arquivo.write(REGISTRO.pack(*campos))
+        self.arquivo.flush()
+
+    def lance(self, board, lado, mov, valor=None, prof=0, nos=0, segundos=0.0):
+        pos = board if type(board) is Posicao else de_tabuleiro(board)
+        self.lances += 1
+        self._escrever(LANCE, lado.encode(), prof, b'-', pos.onca, pos.caes, min(nos, 0xffffffff),
+                       math.nan if valor is None else valor, segundos,
+                       codificar_movimento(mov) if mov else b'')
+
+    def fim(self, vencedor):
+        self._escrever(FIM, b'-', 0, vencedor.encode() if vencedor else EMPATE, 0, 0, 0, math.nan, 0.0, b'')
+
+    def fechar(self):
+        self.arquivo.close()
+
+class Gravacao:
+    def __init__(self, caminho):
+        self.arquivo = open(caminho, 'rb')
+        self.dados = mmap.mmap(self.arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, versao, tamanho = CABECALHO.unpack_from(self.dados, 0)
+        if magico != MAGICO or versao != VERSAO or tamanho != REGISTRO.size:
+            raise ValueError(f"gravacao incompativel: {caminho}")
+        # um registro incompleto no fim (processo interrompido no meio da escrita) e ignorado
+        self.registros = (len(self.dados) - CABECALHO.size) // REGISTRO.size
+
+    def __len__(self):
+        return self.registros
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.registros:
+            raise IndexError(i)
+        tipo, lado, prof, resultado, onca, caes, nos, valor, segundos, lance = \
+            REGISTRO.unpack_from(self.dados, CABECALHO.size + i * REGISTRO.size)
+        return Jogada(tipo, lado.decode(), prof, resultado.decode(), onca, caes, nos,
+                      None if math.isnan(valor) else valor, segundos,
+                      decodificar_movimento(lance) if lance[0] else None)
+
+    def __iter__(self):
+        for i in range(self.registros):
+            yield self[i]
+
+    def partidas(self):
+        # (vencedor, lances) de cada partida; None para empate ou partida sem FIM
+        lances = []
+        for jogada in self:
+            if jogada.tipo == LANCE:
+                lances.append(jogada)
+            elif jogada.tipo == FIM:
+                yield (None if jogada.resultado == '-' else jogada.resultado), lances
+                lances = []
+            elif lances:
+                yield None, lances
+                lances = []
+        if lances:
+            yield None, lances
+
+    def fechar(self):
+        self.dados.close()
+        self.arquivo.close()
+
+def repetir(caminho, prof=None, tt=1 << 18, limite=None):
+    # refaz a busca em cada posicao gravada, com estado zerado; sem prof usa a gravada.
+    # Com o estado zerado o resultado e reprodutivel e serve de base para comparar versoes;
+    # contra o lance gravado pode divergir (ruido da avaliacao, historico de repeticoes)
+    gravacao = Gravacao(caminho)
+    posicoes = nos = 0
+    segundos = 0.0
+    lances = {}
+    divergencias = 0
+    try:
+        for i, jogada in enumerate(gravacao):
+            if jogada.tipo != LANCE or jogada.lance is None:
+                continue
+            if limite is not None and posicoes >= limite:
+                break
+            p = prof or jogada.prof
+            reiniciar_estado(tt)
+            nos_inicio = mm.NOS
+            inicio = time.perf_counter()
+            _, mov = minimax(Posicao(jogada.onca, jogada.caes), p, jogada.lado == 'o')
+            segundos += time.perf_counter() - inicio
+            nos += mm.NOS - nos_inicio
+            posicoes += 1
+            lances[str(i)] = codificar_movimento(mov).hex() if mov else None
+            if mov != jogada.lance:
+                divergencias += 1
+    finally:
+        gravacao.fechar()
+    return {
+        "posicoes": posicoes,
+        "nos": nos,
+        "segundos": round(segundos, 3),
+        "nos_por_segundo": nos / segundos if segundos else 0.0,
+        "divergencias_gravacao": divergencias,
+        "lances": lances,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("gravacao")
+    parser.add_argument("-prof", type=int, default=None, help="padrao: a profundidade gravada em cada lance")
+    parser.add_argument("-tt", type=int, default=1 << 18)
+    parser.add_argument("-pvs", action="store_true")
+    parser.add_argument("-limite", type=int, default=None)
+    parser.add_argument("-cache-avaliacao", type=int, default=1 << 16)
+    # grava o resultado (JSON) para servir de base; -base compara com um resultado anterior
+    parser.add_argument("-saida", default=None)
+    parser.add_argument("-base", default=None)
+    # so lista as partidas, sem buscar
+    parser.add_argument("-listar", action="store_true")
+    args = parser.parse_args()
+    if args.listar:
+        gravacao = Gravacao(args.gravacao)
+        print(f"{len(gravacao)} registros, {os.path.getsize(args.gravacao)} bytes")
+        for n, (vencedor, lances) in enumerate(gravacao.partidas()):
+            print(f"partida {n}: {len(lances)} lances, vencedor {vencedor or 'empate/desconhecido'}")
+        gravacao.fechar()
+        return
+    mm.PVS = args.pvs
+    avaliacao.configurar_cache(args.cache_avaliacao)
+    resultado = repetir(args.gravacao, args.prof, args.tt, args.limite)
+    print(json.dumps({k: v for k, v in resultado.items() if k != "lances"}, indent=2))
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(resultado, f)
+    if args.base:
+        with open(args.base) as f:
+            base = json.load(f)
+        diferentes = [i for i, lance in resultado["lances"].items() if i in base["lances"] and base["lances"][i] != lance]
+        print(f"{len(diferentes)} lances diferentes da base ({len(resultado['lances'])} posicoes): {diferentes[:20]}")
+        print(f"nos {base['nos']} -> {resultado['nos']}, "
+              f"nos/s {base['nos_por_segundo']:.0f} -> {resultado['nos_por_segundo']:.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import json, sys, time
+import ameacas
+import bitboard
+import minimax as mm
+import movimentos
+
+# fase -> (modulo, funcao) que o cronometro substitui enquanto a instrumentacao esta ligada;
+# os tempos sao inclusivos (avaliar inclui ameacas, etc.)
+FASES = {
+    "gerar_movimentos": [
+        (movimentos, "gerar_movimentos"), (movimentos, "gerar_movimentos_onca"),
+        (bitboard, "gerar_movimentos"), (bitboard, "gerar_movimentos_onca"),
+    ],
+    "ordenacao": [(mm, "ordenar")],
+    "avaliar": [(mm, "avaliar")],
+    "ameacas": [(ameacas, "mapa"), (ameacas.MapaAmeacas, "diagonais")],
+}
+
+class Instrumentacao:
+    def __init__(self, destino):
+        self.destino = destino
+        self.originais = []
+        self.dentro = dict.fromkeys(FASES, False)
+        self.iniciar_lance()
+
+    def iniciar_lance(self):
+        self.inicio = time.perf_counter()
+        self.nos_inicio = mm.NOS
+        self.folhas = 0
+        self.nos_internos = 0
+        self.filhos_buscados = 0
+        self.cortes = {}
+        self.prof_max = 0
+        self.tempos = dict.fromkeys(FASES, 0.0)
+        self.chamadas = dict.fromkeys(FASES, 0)
+
+    def folha(self, ply):
+        self.folhas += 1
+        if ply > self.prof_max:
+            self.prof_max = ply
+
+    def no_interno(self, ply, buscados, corte):
+        self.nos_internos += 1
+        self.filhos_buscados += buscados
+        if corte is not None:
+            self.cortes[corte] = self.cortes.get(corte, 0) + 1
+        if ply + 1 > self.prof_max:
+            self.prof_max = ply + 1
+
+    def _cronometro(self, fase, funcao):
+        def medida(*args):
+            if self.dentro[fase]:
+                return funcao(*args)
+            self.dentro[fase] = True
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args)
+            finally:
+                self.tempos[fase] += time.perf_counter() - inicio
+                self.chamadas[fase] += 1
+                self.dentro[fase] = False
+        return medida
+
+    def instalar(self):
+        for fase, alvos in FASES.items():
+            for modulo, nome in alvos:
+                funcao = getattr(modulo, nome)
+                self.originais.append((modulo, nome, funcao))
+                setattr(modulo, nome, self._cronometro(fase, funcao))
+
+    def remover(self):
+        for modulo, nome, funcao in reversed(self.originais):
+            setattr(modulo, nome, funcao)
+        self.originais = []
+
+    def registro(self, **extra):
+        total_cortes = sum(self.cortes.values())
+        registro = dict(extra)
+        registro.update({
+            "tempo": round(time.perf_counter() - self.inicio, 6),
+            "nos": mm.NOS - self.nos_inicio,
+            "folhas": self.folhas,
+            "nos_internos": self.nos_internos,
+            "ramificacao": self.filhos_buscados / self.nos_internos if self.nos_internos else 0.0,
+            "prof_max": self.prof_max,
+            "cortes": total_cortes,
+            "cortes_por_indice": {str(i): n for i, n in sorted(self.cortes.items())},
+            "corte_primeiro_lance": self.cortes.get(0, 0) / total_cortes if total_cortes else 0.0,
+            "tempos": {fase: round(t, 6) for fase, t in self.tempos.items()},
+            "chamadas": self.chamadas,
+        })
+        return registro
+
+    def emitir(self, **extra):
+        self.destino.write(json.dumps(self.registro(**extra)) + "\n")
+        self.destino.flush()
+
+def ativar(caminho="-"):
+    desativar()
+    destino = sys.stderr if caminho == "-" else open(caminho, "a")
+    mm.INSTR = Instrumentacao(destino)
+    mm.INSTR.instalar()
+    return mm.INSTR
+
+def desativar():
+    instr = mm.INSTR
+    if instr is None:
+        return
+    mm.INSTR = None
+    instr.remover()
+    if instr.destino is not sys.stderr:
+        instr.destino.close()
@@ -0,0 +1,143 @@
+import argparse, mmap, random, struct
+import ordenacao
+import transposicao
+from bitboard import de_tabuleiro, codificar_movimento, decodificar_movimento, espelhar_movimento, motor_de
+from busca import busca_iterativa
+from movimentos import chave_salto
+from minimax import minimax
+from simulador import tabuleiro_inicial
+from utils import RECENT_BOARDS
+from zobrist import hash_tabuleiro, chave_tabela, canonica, espelhada
+
+# livro de aberturas: tabela de enderecamento aberto indexada pela chave da tabela de
+# transposicao (posicao canonica + vez), com o lance na orientacao canonica. Cada entrada tem a chave (0 = vazia) e o lance codificado
+# por bitboard.codificar_movimento; saltos com mais de TAM_LANCE - 1 casas nao cabem.
+MAGICO = b'JOLV'
+VERSAO = 2
+CABECALHO = struct.Struct('<4sHHI')
+TAM_LANCE = 8
+ENTRADA = struct.Struct(f'<Q{TAM_LANCE}s')
+
+LIVRO = None
+
+class Livro:
+    def __init__(self, caminho):
+        self.arquivo = open(caminho, 'rb')
+        self.dados = mmap.mmap(self.arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, versao, self.plies, self.entradas = CABECALHO.unpack_from(self.dados, 0)
+        if magico != MAGICO or versao != VERSAO:
+            raise ValueError(f"livro incompativel: {caminho}")
+        if len(self.dados) != CABECALHO.size + self.entradas * ENTRADA.size:
+            raise ValueError(f"livro truncado: {caminho}")
+        self.mascara = self.entradas - 1
+
+    def lance(self, chave):
+        i = chave & self.mascara
+        while True:
+            k, mov = ENTRADA.unpack_from(self.dados, CABECALHO.size + i * ENTRADA.size)
+            if k == chave:
+                return decodificar_movimento(mov)
+            if k == 0:
+                return None
+            i = (i + 1) & self.mascara
+
+    def fechar(self):
+        self.dados.close()
+        self.arquivo.close()
+
+def carregar(caminho):
+    global LIVRO
+    LIVRO = Livro(caminho)
+    return LIVRO
+
+def consultar(board, maximizando):
+    # o lance so e usado se for legal na posicao (protege contra colisao de chave)
+    if LIVRO is None:
+        return None
+    h = hash_tabuleiro(board)
+    mov = LIVRO.lance(chave_tabela(h, maximizando))
+    if mov is None:
+        return None
+    if espelhada(h):
+        mov = espelhar_movimento(mov)
+    moves = motor_de(board).gerar_movimentos(board, 'o' if maximizando else 'c')
+    if mov in moves:
+        return mov
+    if mov[2] == 'salto_consecutivo':
+        # espelhado, o caminho guardado pode nao ser o que a deduplicacao mantem: vale o lance
+        # gerado com a mesma casa final e os mesmos caes capturados
+        chave = chave_salto(mov[0])
+        for m in moves:
+            if m[2] == 'salto_consecutivo' and chave_salto(m[0]) == chave:
+                return m
+    return None
+
+def construir(plies, prof, tempo=None, semente=0):
+    # para cada lado, segue apenas o lance escolhido nas vezes dele e todas as respostas
+    # do adversario, ate plies lances a partir da posicao inicial
+    lances = {}
+    transposicao.configurar(1 << 20, "profundidade")
+    for lado in ('o', 'c'):
+        fronteira = [de_tabuleiro(tabuleiro_inicial())]
+        vez = 'o'
+        for ply in range(plies):
+            proxima = {}
+            for pos in fronteira:
+                motor = motor_de(pos)
+                if vez == lado:
+                    h = hash_tabuleiro(pos)
+                    chave = chave_tabela(h, vez == 'o')
+                    if chave not in lances:
+                        RECENT_BOARDS.clear()
+                        random.seed(semente)
+                        transposicao.TABELA.nova_busca()
+                        ordenacao.nova_busca()
+                        if tempo is not None:
+                            _, mov, _ = busca_iterativa(pos, vez == 'o', tempo, prof)
+                        else:
+                            _, mov = minimax(pos.copia(), prof, vez == 'o')
+                        if mov is None or len(codificar_movimento(mov)) > TAM_LANCE:
+                            continue
+                        lances[chave] = espelhar_movimento(mov) if espelhada(h) else mov
+                    mov = lances[chave]
+                    filhos = [espelhar_movimento(mov) if espelhada(h) else mov]
+                else:
+                    filhos = motor.gerar_movimentos(pos, vez)
+                for mov in filhos:
+                    filho = motor.aplicar_movimento(pos, mov)
+                    # posicoes espelhadas entre si viram uma so
+                    proxima.setdefault(canonica(hash_tabuleiro(filho)), filho)
+            fronteira = list(proxima.values())
+            vez = 'c' if vez == 'o' else 'o'
+            print(f"{lado} ply {ply + 1}: {len(lances)} lances, {len(fronteira)} posicoes")
+    return lances
+
+def salvar(caminho, lances, plies):
+    entradas = 1
+    while entradas < 2 * len(lances):
+        entradas *= 2
+    tabela = [None] * entradas
+    for chave, mov in lances.items():
+        i = chave & (entradas - 1)
+        while tabela[i] is not None:
+            i = (i + 1) & (entradas - 1)
+        tabela[i] = (chave, codificar_movimento(mov))
+    with open(caminho, 'wb') as f:
+        f.write(CABECALHO.pack(MAGICO, VERSAO, plies, entradas))
+        for entrada in tabela:
+            f.write(ENTRADA.pack(*entrada) if entrada is not None else bytes(ENTRADA.size))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-plies", type=int, default=6)
+    parser.add_argument("-prof", type=int, default=8)
+    parser.add_argument("-tempo", type=float, default=None)
+    parser.add_argument("-semente", type=int, default=0)
+    parser.add_argument("-saida", default="livro.bin")
+    args = parser.parse_args()
+    lances = construir(args.plies, args.prof, args.tempo, args.semente)
+    salvar(args.saida, lances, args.plies)
+    print(f"{len(lances)} posicoes em {args.saida}")
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,31 @@
-import argparse
-from conexao_tabuleiro import conecta, recebe_raw, envia_raw
-from utils import parse_board_from_lines, RECENT_BOARDS, board_to_key
-from movimentos import gerar_movimentos
+import argparse, time
+from utils import parse_board_from_lines, RECENT_BOARDS, historico_chave
+import minimax as mm
 from minimax import minimax, format_move
+from busca import busca_iterativa, JANELA_ASPIRACAO, PROF_MAXIMA
+from paralelo import minimax_paralelo
+from zobrist import hash_tabuleiro
+import bitboard
+import transposicao
+import avaliacao
+import armazem
+import ordenacao
+import tablebase
+import livro
+import instrumentacao
+import transporte
+from ponder import Ponderador
+from simulador import resultado, abertura
+import gravacao
 
 MAX_PROF = 4
 
+def profundidade(prof, tempo):
+    # sem -prof explicito: com -tempo quem limita a busca iterativa e o prazo
+    if prof is not None:
+        return prof
+    return MAX_PROF if tempo is None else PROF_MAXIMA
+
 def parse_message(msg: str):
     lines = [l.strip() for l in msg.splitlines() if l.strip()]
     if not lines:
@@ -26,33 +46,139 @@ def main():
     parser.add_argument("lado", choices=["o", "c"])
     parser.add_argument("-ip", default="127.0.0.1")
     parser.add_argument("-porta", default="10001")
+    # "ctypes" usa a libtabuleiro.so antiga via conexao_tabuleiro
+    parser.add_argument("-transporte", choices=["python", "ctypes"], default="python")
+    parser.add_argument("-motor", choices=["lista", "bitboard"], default="bitboard")
+    parser.add_argument("-prof", type=int, default=None, help=f"padrao: {MAX_PROF}, ou sem limite com -tempo")
+    parser.add_argument("-tempo", type=float, default=None)
+    parser.add_argument("-workers", type=int, default=1)
+    parser.add_argument("-tablebase", default=None)
+    parser.add_argument("-livro", default=None)
+    parser.add_argument("-ponder", action="store_true")
+    parser.add_argument("-seguranca", action="store_true")
+    # PVS nos nos internos e janela de aspiracao na raiz da busca iterativa
+    parser.add_argument("-pvs", action="store_true")
+    parser.add_argument("-tt", type=int, default=1 << 18)
+    parser.add_argument("-tt-politica", choices=transposicao.POLITICAS, default="profundidade")
+    # entradas do cache de avaliacao (0 desliga e volta o ruido aleatorio a cada avaliacao)
+    parser.add_argument("-cache-avaliacao", type=int, default=1 << 16)
+    # JSON com pesos W_* da avaliacao (os ausentes ficam com o valor padrao)
+    parser.add_argument("-pesos", default=None)
+    # uma linha JSON por lance com contadores e tempos da busca; "-" escreve no stderr
+    parser.add_argument("-instrumentar", nargs="?", const="-", default=None)
+    # TT e avaliacoes persistentes em disco, compartilhadas entre partidas e processos (armazem.py)
+    parser.add_argument("-armazem", default=None)
+    parser.add_argument("-armazem-entradas", type=int, default=1 << 20)
+    # acrescenta cada lance jogado a uma gravacao binaria (gravacao.py)
+    parser.add_argument("-gravar", default=None)
     args = parser.parse_args()
+    args.prof = profundidade(args.prof, args.tempo)
+    instr = instrumentacao.ativar(args.instrumentar) if args.instrumentar else None
+    transposicao.configurar(args.tt, args.tt_politica)
+    avaliacao.configurar_cache(args.cache_avaliacao)
+    if args.pesos:
+        avaliacao.carregar_pesos(args.pesos)
+    if args.armazem:
+        armazem.abrir(args.armazem, avaliacao.assinatura(), args.armazem_entradas, args.armazem_entradas)
+    ordenacao.USAR_SEGURANCA = args.seguranca
+    mm.PVS = args.pvs
+    if args.tablebase:
+        tablebase.carregar(args.tablebase)
+    if args.livro:
+        livro.carregar(args.livro)
+    conexao = transporte
+    if args.transporte == "ctypes":
+        import conexao_tabuleiro as conexao
     argv = [b"python", args.lado.encode(), args.ip.encode(), args.porta.encode()]
-    conecta(argv)
+    conexao.conecta(argv)
+    recebe_raw, envia_raw = conexao.recebe_raw, conexao.envia_raw
     jogada_count = 0
+    ponderador = Ponderador() if args.ponder else None
+    gravador = gravacao.Gravador(args.gravar) if args.gravar else None
+    terminada = False
     while True:
         msg = recebe_raw()
         if not msg:
+            # so a libtabuleiro (-transporte ctypes) devolve o buffer vazio; o transporte python
+            # sempre volta com a resposta do BLPOP ou levanta ConnectionError
             continue
         meu_lado, lado_jogou, tipo_movimento, board = parse_message(msg)
         if not board:
             continue
         if meu_lado != args.lado:
             continue
+        if gravador is not None and gravador.lances and abertura(board):
+            # o controlador comecou outra partida nesta sessao: novo registro
+            gravador.nova_partida()
+            terminada = False
+        if gravador is not None and not terminada:
+            vencedor = resultado(board)
+            if vencedor:
+                gravador.fim(vencedor)
+                terminada = True
+        ponder_mov = None
+        if ponderador is not None:
+            ponderador.parar()
+            acertou = ponderador.acertou(board)
+            print(f"ponder {'acerto' if acertou else 'erro'} profundidade {ponderador.prof}")
+            if acertou and args.tempo is None and ponderador.prof >= args.prof:
+                ponder_mov = ponderador.mov
+        if args.motor == "bitboard":
+            board = bitboard.de_tabuleiro(board)
+        motor = bitboard.motor_de(board)
         jogada_count += 1
         print(f"jogada {jogada_count}")
-        moves = gerar_movimentos(board, args.lado)
+        moves = motor.gerar_movimentos(board, args.lado)
         if not moves:
             cmd = f"{args.lado} n\n\n"
             print(cmd.strip())
             envia_raw(cmd)
+            if gravador is not None and not terminada:
+                gravador.fim('c' if args.lado == 'o' else 'o')
+                terminada = True
             continue
-        val, mov = minimax(board, MAX_PROF, args.lado == 'o')
+        if transposicao.TABELA is not None:
+            transposicao.TABELA.nova_busca(historico_chave())
+        ordenacao.nova_busca()
+        if instr is not None:
+            instr.iniciar_lance()
+        prof = args.prof
+        val = None
+        nos_inicio = mm.NOS
+        inicio = time.perf_counter()
+        livro_mov = livro.consultar(board, args.lado == 'o')
+        if livro_mov is not None:
+            mov = livro_mov
+            print("livro")
+        elif ponder_mov is not None:
+            mov = ponder_mov
+        elif args.tempo is not None:
+            val, mov, prof = busca_iterativa(board, args.lado == 'o', args.tempo, args.prof, args.workers,
+                                             JANELA_ASPIRACAO if args.pvs else None)
+            print(f"profundidade {prof}")
+        elif args.workers > 1:
+            val, mov = minimax_paralelo(board, args.prof, args.lado == 'o', args.workers)
+        else:
+            val, mov = minimax(board, args.prof, args.lado == 'o')
+        segundos = time.perf_counter() - inicio
+        if transposicao.TABELA is not None:
+            print(f"tt {transposicao.TABELA.relatorio()}")
+        if avaliacao.CACHE is not None:
+            print(f"cache avaliacao {avaliacao.CACHE.relatorio()}")
+        if armazem.ARMAZEM is not None:
+            print(f"armazem {armazem.ARMAZEM.relatorio()}")
+        if instr is not None:
+            instr.emitir(jogada=jogada_count, lado=args.lado, prof=prof, ponder=ponder_mov is not None,
+                         lance=format_move(mov, args.lado).strip() if mov else None)
+        if gravador is not None:
+            gravador.lance(board, args.lado, mov, val, prof, mm.NOS - nos_inicio, segundos)
         if mov:
             cmd = format_move(mov, args.lado)
             print(cmd.strip())
             envia_raw(cmd)
-            RECENT_BOARDS.append(board_to_key(board))
+            RECENT_BOARDS.append(hash_tabuleiro(board))
+            if ponderador is not None:
+                ponderador.iniciar(motor.aplicar_movimento(board, mov), args.lado != 'o')
         else:
             cmd = f"{args.lado} n\n\n"
             print(cmd.strip())
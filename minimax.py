@@ -1,139 +1,171 @@
-import math, random
-from movimentos import gerar_movimentos, aplicar_movimento, find_all_pieces_local, get_cell, pos_valida
-from avaliacao import avaliar, analisar_vulnerabilidade_diagonal
-from utils import board_to_key
+import math, random, time
+from avaliacao import avaliar, analisar_posicao
+import ordenacao
+from ordenacao import ordenar, registrar_corte, seguranca_movimento
+from bitboard import motor_de, espelhar_movimento
+import transposicao
+import tablebase
+import armazem
+from transposicao import EXATO, INFERIOR, SUPERIOR
+from utils import CAMINHO
+from zobrist import hash_tabuleiro, atualizar, chave_tabela, espelhada
 
-def minimax(board, prof, maximizando, alpha=-math.inf, beta=math.inf, path_history=None):
-    if path_history is None:
-        path_history = []
-    current_key = board_to_key(board)
-    if path_history.count(current_key) >= 2:
+# instante (time.monotonic) a partir do qual a busca e abortada com TempoEsgotado;
+# com um prazo definido, CANCELADO = True tambem aborta (usado para parar o ponder)
+PRAZO = None
+CANCELADO = False
+# nos visitados desde o inicio do processo
+NOS = 0
+# coletor do instrumentacao.py; None desliga os ganchos
+INSTR = None
+# principal variation search: depois do primeiro filho, os irmaos sao testados com janela
+# nula e so rebuscados com a janela inteira quando o teste indica que podem ser melhores
+PVS = False
+
+class TempoEsgotado(Exception):
+    pass
+
+def minimax(board, prof, maximizando, alpha=-math.inf, beta=math.inf, h=None, primeiro=None, ply=0):
+    global NOS
+    NOS += 1
+    if PRAZO is not None and (CANCELADO or time.monotonic() >= PRAZO):
+        raise TempoEsgotado()
+    if h is None:
+        h = hash_tabuleiro(board)
+    motor = motor_de(board)
+    gerar_movimentos = motor.gerar_movimentos
+    fazer_movimento = motor.fazer_movimento
+    desfazer_movimento = motor.desfazer_movimento
+    # CAMINHO tem as posicoes dos ancestrais deste no (utils.Caminho)
+    if CAMINHO.count(h) >= 2:
         return (-50000 if maximizando else 50000), None
-    from utils import count_pieces
-    onca, cachorros = count_pieces(board, pos_valida, get_cell)
-    if cachorros <= 5:
+    tabela = transposicao.TABELA
+    tt_mov = None
+    if tabela is not None and prof > 0:
+        tt_key = chave_tabela(h, maximizando)
+        entrada = tabela.consultar(tt_key)
+        # o armazem tambem e consultado quando a TT so tem o lance (entrada de outro contexto)
+        if (entrada is None or entrada[2] < 0) and armazem.ARMAZEM is not None and prof >= armazem.PROF_MINIMA:
+            guardada = armazem.ARMAZEM.consultar(tt_key, tabela.contexto)
+            if guardada is not None and (entrada is None or guardada[2] >= 0):
+                entrada = guardada
+        if entrada is not None:
+            tt_val, tt_tipo, tt_prof, tt_mov = entrada
+            # a tabela guarda so a forma canonica; o lance volta para esta orientacao
+            if tt_mov is not None and espelhada(h):
+                tt_mov = espelhar_movimento(tt_mov)
+            if tt_prof >= prof and tt_mov is not None:
+                if tt_tipo == EXATO:
+                    return tt_val, tt_mov
+                if tt_tipo == INFERIOR:
+                    alpha = max(alpha, tt_val)
+                elif tt_tipo == SUPERIOR:
+                    beta = min(beta, tt_val)
+                if beta <= alpha:
+                    return tt_val, tt_mov
+    analise = analisar_posicao(board)
+    if len(analise.dogs_positions) <= 5:
         return 50000, None
-    if onca == 0:
+    if not analise.onca_pos:
         return -50000, None
-    if not gerar_movimentos(board, 'o'):
+    if not analise.onca_moves:
         return -50000, None
+    if ply > 0 and tablebase.TABELAS:
+        resultado = tablebase.consultar(board, maximizando)
+        if resultado is not None:
+            vence_onca, n = resultado
+            return (50000 - n if vence_onca else -50000 + n), None
     if prof == 0:
-        return avaliar(board, 'o' if maximizando else 'c'), None
-    new_path = path_history + [current_key]
-    if maximizando:
-        melhor_val = -math.inf
-        melhor_mov = None
-        moves = gerar_movimentos(board, 'o')
-        saltos = [m for m in moves if len(m) == 3 and m[2] == 'salto_consecutivo']
-        normais = [m for m in moves if not (len(m) == 3 and m[2] == 'salto_consecutivo')]
-        random.shuffle(saltos)
-        random.shuffle(normais)
-        moves = saltos + normais
-        for mov in moves:
-            nb = aplicar_movimento(board, mov)
-            val, _ = minimax(nb, prof - 1, False, alpha, beta, new_path)
-            if val > melhor_val:
-                melhor_val = val
-                melhor_mov = mov
-            alpha = max(alpha, val)
-            if beta <= alpha:
-                break
-        return melhor_val, melhor_mov
-    else:
-        melhor_val = math.inf
-        melhor_mov = None
-        moves = gerar_movimentos(board, 'c')
-        if not moves:
-            return 50000, None
-        def avaliar_seguranca_movimento(mov):
-            (l1, c1), (l2, c2), _ = mov
-            nb = aplicar_movimento(board, mov)
-            nb_key = board_to_key(nb)
-            repeticoes = new_path.count(nb_key)
-            onca_pos = find_all_pieces_local(nb, 'o')
-            if onca_pos:
-                risco_diag, diagonais_exp, protecao_ok = analisar_vulnerabilidade_diagonal(
-                    nb, l2, c2, onca_pos[0]
-                )
-            else:
-                risco_diag, diagonais_exp, protecao_ok = 0, [], True
-            risco_diagonal_normalizado = len(diagonais_exp) + (0 if protecao_ok else 2)
-            vulnerabilidade_diagonal = risco_diag / 100.0
-            onca_moves_after = gerar_movimentos(nb, 'o')
-            em_risco_imediato = False
-            em_risco_diagonal_imediato = False
-            capturas_possiveis = 0
-            for m in onca_moves_after:
-                if len(m) == 3 and m[2] == 'salto_consecutivo':
-                    caminho = m[0]
-                    for i in range(len(caminho) - 1):
-                        ml = (caminho[i][0] + caminho[i+1][0]) // 2
-                        mc = (caminho[i][1] + caminho[i+1][1]) // 2
-                        if (ml, mc) == (l2, c2):
-                            em_risco_imediato = True
-                            capturas_possiveis += 1
-                            if abs(caminho[i][0] - caminho[i+1][0]) == 2 and \
-                               abs(caminho[i][1] - caminho[i+1][1]) == 2:
-                                em_risco_diagonal_imediato = True
-                            break
-                elif m[2] == (l2, c2):
-                    em_risco_imediato = True
-                    capturas_possiveis += 1
+        if INSTR is not None:
+            INSTR.folha(ply)
+        return avaliar(board, 'o' if maximizando else 'c', h, analise), None
+    CAMINHO.entrar(h)
+    try:
+        alpha_inicial, beta_inicial = alpha, beta
+        if maximizando:
+            melhor_val = -math.inf
+            melhor_mov = None
+            moves = analise.onca_moves
+            random.shuffle(moves)
+            ordenar(moves, ply, True, tt_mov, primeiro)
+            corte = None
+            for i, mov in enumerate(moves):
+                desfazer = fazer_movimento(board, mov)
+                h_filho = atualizar(h, mov, 'o')
+                if PVS and i > 0:
+                    val, _ = minimax(board, prof - 1, False, alpha, alpha + 1, h_filho, ply=ply + 1)
+                    if alpha < val < beta:
+                        val, _ = minimax(board, prof - 1, False, alpha, beta, h_filho, ply=ply + 1)
+                else:
+                    val, _ = minimax(board, prof - 1, False, alpha, beta, h_filho, ply=ply + 1)
+                desfazer_movimento(board, desfazer)
+                if val > melhor_val:
+                    melhor_val = val
+                    melhor_mov = mov
+                alpha = max(alpha, val)
+                if beta <= alpha:
+                    registrar_corte(mov, ply, prof, True)
+                    corte = i
+                    break
+            if INSTR is not None:
+                INSTR.no_interno(ply, i + 1, corte)
+            guardar(tabela, h, maximizando, melhor_val, alpha_inicial, beta_inicial, prof, melhor_mov)
+            return melhor_val, melhor_mov
+        else:
+            melhor_val = math.inf
+            melhor_mov = None
+            moves = gerar_movimentos(board, 'c')
+            if not moves:
+                return 50000, None
+            seguranca = None
+            if ordenacao.USAR_SEGURANCA:
+                def seguranca(mov):
+                    repeticoes = CAMINHO.count(atualizar(h, mov, 'c'))
+                    return (repeticoes * 1000,) + seguranca_movimento(board, h, mov)
+            ordenar(moves, ply, False, tt_mov, primeiro, seguranca)
+            corte = None
+            for i, mov in enumerate(moves):
+                desfazer = fazer_movimento(board, mov)
+                h_filho = atualizar(h, mov, 'c')
+                if PVS and i > 0:
+                    val, _ = minimax(board, prof - 1, True, beta - 1, beta, h_filho, ply=ply + 1)
+                    if alpha < val < beta:
+                        val, _ = minimax(board, prof - 1, True, alpha, beta, h_filho, ply=ply + 1)
+                else:
+                    val, _ = minimax(board, prof - 1, True, alpha, beta, h_filho, ply=ply + 1)
+                desfazer_movimento(board, desfazer)
+                if val < melhor_val:
+                    melhor_val = val
+                    melhor_mov = mov
+                beta = min(beta, val)
+                if beta <= alpha:
+                    registrar_corte(mov, ply, prof, False)
+                    corte = i
                     break
-            suporte_total = 0
-            suporte_diagonal = 0
-            for dl, dc in [(-1,0), (1,0), (0,-1), (0,1)]:
-                nl, nc = l2 + dl, c2 + dc
-                if pos_valida(nl, nc) and get_cell(nb, nl, nc) == 'c':
-                    suporte_total += 1
-            for dl, dc in [(-1,-1), (-1,1), (1,-1), (1,1)]:
-                nl, nc = l2 + dl, c2 + dc
-                if pos_valida(nl, nc) and get_cell(nb, nl, nc) == 'c':
-                    suporte_total += 1
-                    suporte_diagonal += 1
-            movimento_para_tras = 1 if l2 < l1 else 0
-            bonus_linha = 0
-            if l2 in [3, 4]:
-                bonus_linha = -1
-            isolamento = 1 if suporte_total == 0 else 0
-            dogs_positions = find_all_pieces_local(nb, 'c')
-            if dogs_positions:
-                avg_l = sum(dl for dl, dc in dogs_positions) / len(dogs_positions)
-                avg_c = sum(dc for dl, dc in dogs_positions) / len(dogs_positions)
-                dist_centro_grupo = abs(l2 - avg_l) + abs(c2 - avg_c)
-            else:
-                dist_centro_grupo = 0
-            cadeia_diagonal = suporte_diagonal >= 2
-            noise = random.random() * 0.01
-            return (
-                repeticoes * 1000,
-                em_risco_diagonal_imediato * 900,
-                em_risco_imediato * 800,
-                capturas_possiveis * 700,
-                risco_diagonal_normalizado * 600,
-                vulnerabilidade_diagonal,
-                -suporte_diagonal * 50,
-                -suporte_total * 30,
-                isolamento * 400,
-                movimento_para_tras * 200,
-                dist_centro_grupo * 10,
-                -cadeia_diagonal * 100,
-                bonus_linha,
-                noise
-            )
-        moves.sort(key=avaliar_seguranca_movimento)
-        for mov in moves:
-            nb = aplicar_movimento(board, mov)
-            val, _ = minimax(nb, prof - 1, True, alpha, beta, new_path)
-            if val < melhor_val:
-                melhor_val = val
-                melhor_mov = mov
-            beta = min(beta, val)
-            if beta <= alpha:
-                break
-        if melhor_mov is None and moves:
-            melhor_mov = moves[0]
-        return melhor_val, melhor_mov
+            if INSTR is not None:
+                INSTR.no_interno(ply, i + 1, corte)
+            if melhor_mov is None and moves:
+                melhor_mov = moves[0]
+            guardar(tabela, h, maximizando, melhor_val, alpha_inicial, beta_inicial, prof, melhor_mov)
+            return melhor_val, melhor_mov
+    finally:
+        CAMINHO.sair()
+
+def guardar(tabela, h, maximizando, val, alpha, beta, prof, mov):
+    if tabela is None or mov is None:
+        return
+    if val <= alpha:
+        tipo = SUPERIOR
+    elif val >= beta:
+        tipo = INFERIOR
+    else:
+        tipo = EXATO
+    if espelhada(h):
+        mov = espelhar_movimento(mov)
+    chave = chave_tabela(h, maximizando)
+    tabela.armazenar(chave, val, tipo, prof, mov)
+    if armazem.ARMAZEM is not None and prof >= armazem.PROF_MINIMA:
+        armazem.ARMAZEM.armazenar(chave, val, tipo, prof, mov, tabela.contexto)
 
 def format_move(mov, lado):
     if len(mov) == 3 and mov[2] == 'salto_consecutivo':
@@ -150,3 +182,12 @@ def format_move(mov, lado):
             return f"{lado} s 1 {l1} {c1} {l2} {c2}\n"
         else:
             return f"{lado} m {l1} {c1} {l2} {c2}\n"
+
+def ler_movimento(cmd):
+    # inverso de format_move: "o m l c l c" ou "o s n l c ... l c"
+    partes = cmd.split()
+    numeros = [int(x) for x in partes[2:]]
+    if partes[1] == 'm':
+        return ((numeros[0], numeros[1]), (numeros[2], numeros[3]), None)
+    casas = numeros[1:]
+    return ([(casas[i], casas[i + 1]) for i in range(0, len(casas), 2)], None, 'salto_consecutivo')
@@ -1,3 +1,5 @@
+from utils import count_pieces as contar_pecas
+
 def pos_valida(l, c):
     if l < 1 or l > 7 or c < 1 or c > 5:
         return False
@@ -88,6 +90,8 @@ def gerar_saltos_consecutivos(board, l, c, caminho_atual=None, capturados=None):
         capturados = set()
     caminhos = []
     jumps = [(-2, 0), (2, 0), (0, -2), (0, 2), (-2, -2), (-2, 2), (2, -2), (2, 2)]
+    if l == 7:
+        jumps = jumps + [(0, -4), (0, 4)]
     for dl, dc in jumps:
         ld, cd = l + dl, c + dc
         ml, mc = l + dl // 2, c + dc // 2
@@ -103,44 +107,21 @@ def gerar_saltos_consecutivos(board, l, c, caminho_atual=None, capturados=None):
             continue
         if not mov_possivel('s', l, c, ld, cd):
             continue
-        novo_board = [linha[:] for linha in board]
-        set_cell(novo_board, ml, mc, '-')
-        set_cell(novo_board, l, c, '-')
-        set_cell(novo_board, ld, cd, 'o')
-        novos_capturados = capturados | {(ml, mc)}
-        novo_caminho = caminho_atual + [(ld, cd)]
-        subcaminhos = gerar_saltos_consecutivos(novo_board, ld, cd, novo_caminho, novos_capturados)
+        set_cell(board, ml, mc, '-')
+        set_cell(board, l, c, '-')
+        set_cell(board, ld, cd, 'o')
+        capturados.add((ml, mc))
+        caminho_atual.append((ld, cd))
+        subcaminhos = gerar_saltos_consecutivos(board, ld, cd, caminho_atual, capturados)
         if subcaminhos:
             caminhos.extend(subcaminhos)
         else:
-            caminhos.append(novo_caminho)
-    if l == 7:
-        for dc in [-4, 4]:
-            cd = c + dc
-            mc = c + dc // 2
-            if not pos_valida(7, cd):
-                continue
-            if not pos_valida(7, mc):
-                continue
-            if get_cell(board, 7, mc) != 'c':
-                continue
-            if get_cell(board, 7, cd) != '-':
-                continue
-            if (7, mc) in capturados:
-                continue
-            if not mov_possivel('s', 7, c, 7, cd):
-                continue
-            novo_board = [linha[:] for linha in board]
-            set_cell(novo_board, 7, mc, '-')
-            set_cell(novo_board, 7, c, '-')
-            set_cell(novo_board, 7, cd, 'o')
-            novos_capturados = capturados | {(7, mc)}
-            novo_caminho = caminho_atual + [(7, cd)]
-            subcaminhos = gerar_saltos_consecutivos(novo_board, 7, cd, novo_caminho, novos_capturados)
-            if subcaminhos:
-                caminhos.extend(subcaminhos)
-            else:
-                caminhos.append(novo_caminho)
+            caminhos.append(caminho_atual[:])
+        caminho_atual.pop()
+        capturados.discard((ml, mc))
+        set_cell(board, ld, cd, '-')
+        set_cell(board, l, c, 'o')
+        set_cell(board, ml, mc, 'c')
     return caminhos
 
 def gerar_movimentos_onca(board):
@@ -159,38 +140,67 @@ def gerar_movimentos_onca(board):
             if get_cell(board, ld, cd) == '-':
                 if mov_possivel('m', l, c, ld, cd):
                     moves.append(((l, c), (ld, cd), None))
-    caminhos = gerar_saltos_consecutivos(board, l, c)
+    caminhos = deduplicar_saltos(gerar_saltos_consecutivos(board, l, c))
     for caminho in caminhos:
         if len(caminho) > 1:
             moves.append((caminho, None, 'salto_consecutivo'))
     return moves
 
+def chave_salto(caminho):
+    # o que identifica um lance de salto: casa final e caes capturados
+    return caminho[-1], frozenset(((l1 + l2) // 2, (c1 + c2) // 2) for (l1, c1), (l2, c2) in zip(caminho, caminho[1:]))
+
+def deduplicar_saltos(caminhos):
+    # ordens diferentes que capturam os mesmos caes e param na mesma casa sao o mesmo
+    # lance; fica o menor caminho. A avaliacao conta lances, nao caminhos (ver avaliacao.VERSAO)
+    finais = {}
+    for caminho in caminhos:
+        chave = chave_salto(caminho)
+        if chave not in finais or caminho < finais[chave]:
+            finais[chave] = caminho
+    return list(finais.values())
+
+def count_pieces(board):
+    return contar_pecas(board, pos_valida, get_cell)
+
 def gerar_movimentos(board, lado):
     if lado == 'c':
         return gerar_movimentos_cachorro(board)
     else:
         return gerar_movimentos_onca(board)
 
-def aplicar_movimento(board, mov):
-    b2 = [linha[:] for linha in board]
+def fazer_movimento(board, mov):
+    desfazer = []
+    def trocar(l, c, value):
+        desfazer.append((l, c, get_cell(board, l, c)))
+        set_cell(board, l, c, value)
     if len(mov) == 3 and mov[2] == 'salto_consecutivo':
         caminho = mov[0]
         l_inicio, c_inicio = caminho[0]
-        set_cell(b2, l_inicio, c_inicio, '-')
+        trocar(l_inicio, c_inicio, '-')
         for i in range(len(caminho) - 1):
             l1, c1 = caminho[i]
             l2, c2 = caminho[i + 1]
             ml = (l1 + l2) // 2
             mc = (c1 + c2) // 2
-            set_cell(b2, ml, mc, '-')
+            trocar(ml, mc, '-')
         l_final, c_final = caminho[-1]
-        set_cell(b2, l_final, c_final, 'o')
+        trocar(l_final, c_final, 'o')
     else:
         (l1, c1), (l2, c2), captura = mov
-        peca = get_cell(b2, l1, c1)
-        set_cell(b2, l2, c2, peca)
-        set_cell(b2, l1, c1, '-')
+        peca = get_cell(board, l1, c1)
+        trocar(l2, c2, peca)
+        trocar(l1, c1, '-')
         if captura:
             cl, cc = captura
-            set_cell(b2, cl, cc, '-')
+            trocar(cl, cc, '-')
+    return desfazer
+
+def desfazer_movimento(board, desfazer):
+    for l, c, value in reversed(desfazer):
+        set_cell(board, l, c, value)
+
+def aplicar_movimento(board, mov):
+    b2 = [linha[:] for linha in board]
+    fazer_movimento(b2, mov)
     return b2
@@ -0,0 +1,139 @@
+import argparse, asyncio, os, random, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+import minimax as mm
+import ordenacao
+import transposicao
+import bitboard
+from busca import busca_iterativa
+from main import parse_message, MAX_PROF, profundidade
+from minimax import minimax, format_move
+from paralelo import _inicializar
+from transporte import ConexaoAsync
+from utils import RECENT_BOARDS, RECENT_STATES_MAX, historico_chave
+from zobrist import hash_tabuleiro
+
+# um processo atende varias partidas: a E/S de todas roda num unico event loop e as
+# buscas vao para um pool de processos compartilhado. Cada worker mantem a sua tabela
+# de transposicao (aquecida por todas as partidas que passam por ele) e as tabelas
+# pre-calculadas (bitboard, zobrist, tablebase) sao carregadas uma vez por worker,
+# nao uma vez por partida. O contexto da TT (historico_chave) impede que valores de
+# uma partida sejam reaproveitados com o historico de outra.
+
+def memoria_kb():
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _buscar(board, lado, prof, tempo, recentes, semente):
+    RECENT_BOARDS.clear()
+    RECENT_BOARDS.extend(recentes)
+    random.seed(semente)
+    if transposicao.TABELA is not None:
+        transposicao.TABELA.nova_busca(historico_chave())
+    ordenacao.nova_busca()
+    posicao = bitboard.de_tabuleiro(board)
+    nos = mm.NOS
+    if tempo is not None:
+        _, mov, _ = busca_iterativa(posicao, lado == 'o', tempo, prof)
+    else:
+        _, mov = minimax(posicao, prof, lado == 'o')
+    return mov, mm.NOS - nos, os.getpid(), memoria_kb()
+
+class Estatisticas:
+    def __init__(self, partidas):
+        self.partidas = partidas
+        self.inicio = time.monotonic()
+        self.lances = 0
+        self.nos = 0
+        self.memoria_workers = {}
+
+    def registrar(self, nos, pid, memoria):
+        self.lances += 1
+        self.nos += nos
+        self.memoria_workers[pid] = memoria
+
+    def relatorio(self):
+        segundos = max(time.monotonic() - self.inicio, 1e-9)
+        memoria = memoria_kb() + sum(self.memoria_workers.values())
+        return {
+            "partidas": self.partidas,
+            "lances": self.lances,
+            "lances_por_segundo": round(self.lances / segundos, 3),
+            "nos_por_segundo": round(self.nos / segundos, 1),
+            "memoria_kb": memoria,
+            "memoria_por_partida_kb": memoria // max(self.partidas, 1),
+        }
+
+def ler_partida(texto, ip_padrao):
+    # "lado:porta" ou "lado:ip:porta"
+    partes = texto.split(":")
+    if len(partes) == 2:
+        return partes[0], ip_padrao, partes[1]
+    return partes[0], partes[1], partes[2]
+
+async def partida(lado, ip, porta, pool, args, estatisticas):
+    conexao = await ConexaoAsync.abrir(lado, ip, porta)
+    loop = asyncio.get_running_loop()
+    recentes = deque(maxlen=RECENT_STATES_MAX)
+    try:
+        while True:
+            msg = await conexao.recebe()
+            meu_lado, _, _, board = parse_message(msg)
+            if not board or meu_lado != lado:
+                continue
+            mov, nos, pid, memoria = await loop.run_in_executor(
+                pool, _buscar, board, lado, args.prof, args.tempo, list(recentes), random.getrandbits(32))
+            estatisticas.registrar(nos, pid, memoria)
+            if mov:
+                cmd = format_move(mov, lado)
+                recentes.append(hash_tabuleiro(board))
+            else:
+                cmd = f"{lado} n\n\n"
+            print(f"{lado}@{porta} {cmd.strip()}")
+            await conexao.envia(cmd)
+    finally:
+        await conexao.fechar()
+
+async def relatar(estatisticas, intervalo):
+    while True:
+        await asyncio.sleep(intervalo)
+        print(f"multijogo {estatisticas.relatorio()}")
+
+async def executar(args):
+    partidas = [ler_partida(p, args.ip) for p in args.partidas]
+    config = (args.tt, args.tt_politica, args.seguranca, args.tablebase)
+    estatisticas = Estatisticas(len(partidas))
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_inicializar, initargs=config) as pool:
+        relatorio = asyncio.create_task(relatar(estatisticas, args.relatorio))
+        try:
+            await asyncio.gather(*(partida(lado, ip, porta, pool, args, estatisticas) for lado, ip, porta in partidas))
+        finally:
+            relatorio.cancel()
+            print(f"multijogo {estatisticas.relatorio()}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("partidas", nargs="+", help="lado:porta ou lado:ip:porta")
+    parser.add_argument("-ip", default="127.0.0.1")
+    parser.add_argument("-prof", type=int, default=None, help=f"padrao: {MAX_PROF}, ou sem limite com -tempo")
+    parser.add_argument("-tempo", type=float, default=None)
+    parser.add_argument("-workers", type=int, default=os.cpu_count())
+    parser.add_argument("-tablebase", default=None)
+    parser.add_argument("-seguranca", action="store_true")
+    parser.add_argument("-tt", type=int, default=1 << 18)
+    parser.add_argument("-tt-politica", choices=transposicao.POLITICAS, default="profundidade")
+    parser.add_argument("-relatorio", type=float, default=30.0)
+    args = parser.parse_args()
+    args.prof = profundidade(args.prof, args.tempo)
+    try:
+        asyncio.run(executar(args))
+    except (KeyboardInterrupt, ConnectionError):
+        pass
+
+if __name__ == '__main__':
+    main()
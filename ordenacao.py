@@ -0,0 +1,125 @@
+import random
+import ameacas
+from bitboard import BIT, CASAS, INDICE, Posicao, bits, de_tabuleiro
+
+MAX_PLY = 128
+KILLERS = [[None, None] for _ in range(MAX_PLY)]
+HISTORIA = {}
+# a heuristica de seguranca dos caes (ameacas depois do lance) so desempata quando
+# ligada; o resultado fica guardado por (hash, lance)
+USAR_SEGURANCA = False
+CACHE_SEGURANCA = {}
+CACHE_SEGURANCA_MAX = 1 << 16
+
+def chave_movimento(mov):
+    if len(mov) == 3 and mov[2] == 'salto_consecutivo':
+        return tuple(mov[0])
+    return (mov[0], mov[1])
+
+def capturas(mov):
+    if len(mov) == 3 and mov[2] == 'salto_consecutivo':
+        return len(mov[0]) - 1
+    return 1 if mov[2] else 0
+
+def nova_busca():
+    for slots in KILLERS:
+        slots[0] = slots[1] = None
+    for chave in HISTORIA:
+        HISTORIA[chave] //= 2
+
+def registrar_corte(mov, ply, prof, maximizando):
+    if capturas(mov):
+        return
+    chave = chave_movimento(mov)
+    slots = KILLERS[ply]
+    if slots[0] != chave:
+        slots[1] = slots[0]
+        slots[0] = chave
+    chave_h = (maximizando, chave)
+    HISTORIA[chave_h] = HISTORIA.get(chave_h, 0) + prof * prof
+
+def ordenar(moves, ply, maximizando, tt_mov=None, primeiro=None, seguranca=None):
+    killer1, killer2 = KILLERS[ply]
+    tt_chave = chave_movimento(tt_mov) if tt_mov is not None else None
+    primeiro_chave = chave_movimento(primeiro) if primeiro is not None else None
+    def prioridade(mov):
+        chave = chave_movimento(mov)
+        if chave == primeiro_chave:
+            return (-4,)
+        if chave == tt_chave:
+            return (-3,)
+        n = capturas(mov)
+        if n:
+            return (-2, -n)
+        if chave == killer1:
+            return (-1, 0)
+        if chave == killer2:
+            return (-1, 1)
+        historia = -HISTORIA.get((maximizando, chave), 0)
+        if seguranca is None:
+            return (0, historia)
+        return (0, historia, seguranca(mov))
+    moves.sort(key=prioridade)
+
+def seguranca_movimento(board, h, mov):
+    # tudo sobre as mascaras da posicao depois do lance, sem aplica-lo nem gerar as
+    # respostas da onca: as capturas vem de ameacas.capturas (memoizado por posicao)
+    chave = (h, chave_movimento(mov))
+    valor = CACHE_SEGURANCA.get(chave)
+    if valor is not None:
+        return valor
+    (l1, c1), (l2, c2), _ = mov
+    pos = board if type(board) is Posicao else de_tabuleiro(board)
+    casa = INDICE[(l2, c2)]
+    caes = pos.caes & ~BIT[INDICE[(l1, c1)]] | BIT[casa]
+    onca = pos.onca.bit_length() - 1 if pos.onca else None
+    if onca is not None:
+        atacados, diagonais, por_casa = ameacas.capturas(onca, caes)
+    else:
+        atacados, diagonais, por_casa = 0, 0, None
+    mapa = ameacas.MapaAmeacas(onca, caes, atacados)
+    if onca is not None:
+        risco_diag, expostas, protegidas = mapa.diagonais(casa)
+    else:
+        risco_diag, expostas, protegidas = 0, 0, 2
+    protecao_ok = protegidas >= 2
+    risco_diagonal_normalizado = expostas + (0 if protecao_ok else 2)
+    vulnerabilidade_diagonal = risco_diag / 100.0
+    em_risco_imediato = mapa.em_risco(casa)
+    em_risco_diagonal_imediato = diagonais & BIT[casa] != 0
+    capturas_possiveis = por_casa[casa] if por_casa else 0
+    suporte_total = mapa.suporte(casa)
+    suporte_diagonal = mapa.suporte_diagonal(casa)
+    movimento_para_tras = 1 if l2 < l1 else 0
+    bonus_linha = 0
+    if l2 in [3, 4]:
+        bonus_linha = -1
+    isolamento = 1 if suporte_total == 0 else 0
+    dogs_positions = [CASAS[i] for i in bits(caes)]
+    if dogs_positions:
+        avg_l = sum(dl for dl, dc in dogs_positions) / len(dogs_positions)
+        avg_c = sum(dc for dl, dc in dogs_positions) / len(dogs_positions)
+        dist_centro_grupo = abs(l2 - avg_l) + abs(c2 - avg_c)
+    else:
+        dist_centro_grupo = 0
+    cadeia_diagonal = suporte_diagonal >= 2
+    noise = random.random() * 0.01
+    valor = (
+        em_risco_diagonal_imediato * 900,
+        em_risco_imediato * 800,
+        capturas_possiveis * 700,
+        risco_diagonal_normalizado * 600,
+        vulnerabilidade_diagonal,
+        -suporte_diagonal * 50,
+        -suporte_total * 30,
+        isolamento * 400,
+        movimento_para_tras * 200,
+        dist_centro_grupo * 10,
+        -cadeia_diagonal * 100,
+        bonus_linha,
+        noise
+    )
+    if len(CACHE_SEGURANCA) >= CACHE_SEGURANCA_MAX:
+        CACHE_SEGURANCA.clear()
+    CACHE_SEGURANCA[chave] = valor
+    return valor
@@ -0,0 +1,123 @@
+import math, random
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+import minimax as mm
+import ordenacao
+import transposicao
+import tablebase
+import avaliacao
+import armazem
+from minimax import minimax
+from avaliacao import analisar_posicao
+from bitboard import motor_de
+from ordenacao import ordenar
+from utils import RECENT_BOARDS, CAMINHO, historico_chave
+from zobrist import hash_tabuleiro, atualizar
+
+_POOL = None
+_WORKERS = 0
+
+def _inicializar(tt_tamanho, tt_politica, usar_seguranca, diretorio_tablebase, pvs=False, cache_avaliacao=0,
+                 pesos=None, config_armazem=None):
+    transposicao.configurar(tt_tamanho, tt_politica)
+    avaliacao.configurar_cache(cache_avaliacao)
+    if pesos:
+        avaliacao.aplicar_pesos(pesos)
+    if config_armazem:
+        caminho, entradas, avaliacoes = config_armazem
+        armazem.abrir(caminho, avaliacao.assinatura(), entradas, avaliacoes)
+    mm.PVS = pvs
+    ordenacao.USAR_SEGURANCA = usar_seguranca
+    tablebase.TABELAS.clear()
+    if diretorio_tablebase:
+        tablebase.carregar(diretorio_tablebase)
+
+def config_armazem():
+    # os workers abrem o mesmo arquivo: o que um aprende os outros (e o processo principal) leem
+    atual = armazem.ARMAZEM
+    return (atual.caminho, atual.entradas, atual.avaliacoes) if atual is not None else None
+
+def executor(workers):
+    global _POOL, _WORKERS
+    if _POOL is None or _WORKERS != workers:
+        if _POOL is not None:
+            _POOL.shutdown(cancel_futures=True)
+        tabela = transposicao.TABELA
+        config = (
+            tabela.tamanho if tabela is not None else 0,
+            tabela.politica if tabela is not None else "profundidade",
+            ordenacao.USAR_SEGURANCA,
+            tablebase.DIRETORIO,
+            mm.PVS,
+            avaliacao.CACHE.tamanho if avaliacao.CACHE is not None else 0,
+            avaliacao.pesos(),
+            config_armazem(),
+        )
+        _POOL = ProcessPoolExecutor(max_workers=workers, initializer=_inicializar, initargs=config)
+        _WORKERS = workers
+    return _POOL
+
+def encerrar():
+    global _POOL, _WORKERS
+    if _POOL is not None:
+        _POOL.shutdown(cancel_futures=True)
+    _POOL = None
+    _WORKERS = 0
+
+def _buscar_filho(board, prof, maximizando, mov, alpha, beta, h, recentes, prazo, semente):
+    RECENT_BOARDS.clear()
+    RECENT_BOARDS.extend(recentes)
+    random.seed(semente)
+    if transposicao.TABELA is not None:
+        transposicao.TABELA.nova_busca(historico_chave())
+    ordenacao.nova_busca()
+    mm.PRAZO = prazo
+    CAMINHO.clear()
+    CAMINHO.entrar(h)
+    try:
+        motor_de(board).fazer_movimento(board, mov)
+        h_filho = atualizar(h, mov, 'o' if maximizando else 'c')
+        val, _ = minimax(board, prof - 1, not maximizando, alpha, beta, h_filho, ply=1)
+    finally:
+        CAMINHO.sair()
+        mm.PRAZO = None
+    return val
+
+def minimax_paralelo(board, prof, maximizando, workers, primeiro=None):
+    # o primeiro lance e buscado aqui mesmo com janela cheia; os irmaos vao para o pool
+    # ja com o limite que ele estabeleceu (young brothers wait)
+    analise = analisar_posicao(board)
+    if prof <= 1 or len(analise.dogs_positions) <= 5 or not analise.onca_moves:
+        return minimax(board, prof, maximizando, primeiro=primeiro)
+    moves = analise.onca_moves if maximizando else motor_de(board).gerar_movimentos(board, 'c')
+    if len(moves) < 2:
+        return minimax(board, prof, maximizando, primeiro=primeiro)
+    h = hash_tabuleiro(board)
+    ordenar(moves, 0, maximizando, None, primeiro)
+    motor = motor_de(board)
+    lado = 'o' if maximizando else 'c'
+    desfazer = motor.fazer_movimento(board, moves[0])
+    CAMINHO.entrar(h)
+    try:
+        melhor_val, _ = minimax(board, prof - 1, not maximizando, h=atualizar(h, moves[0], lado), ply=1)
+    finally:
+        CAMINHO.sair()
+        motor.desfazer_movimento(board, desfazer)
+    melhor_mov = moves[0]
+    alpha, beta = (melhor_val, math.inf) if maximizando else (-math.inf, melhor_val)
+    pool = executor(workers)
+    recentes = list(RECENT_BOARDS)
+    futuros = {
+        pool.submit(_buscar_filho, board, prof, maximizando, mov, alpha, beta, h,
+                    recentes, mm.PRAZO, random.getrandbits(32)): mov
+        for mov in moves[1:]
+    }
+    prontos, pendentes = wait(futuros, return_when=FIRST_EXCEPTION)
+    for futuro in pendentes:
+        futuro.cancel()
+    for futuro in prontos:
+        futuro.result()
+    for futuro, mov in futuros.items():
+        val = futuro.result()
+        if (val > melhor_val) if maximizando else (val < melhor_val):
+            melhor_val, melhor_mov = val, mov
+    return melhor_val, melhor_mov
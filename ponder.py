@@ -0,0 +1,73 @@
+import math, threading
+import minimax as mm
+import transposicao
+from minimax import minimax, TempoEsgotado
+from busca import copia_tabuleiro, PROF_MAXIMA
+from bitboard import motor_de, espelhar_movimento
+from utils import historico_chave
+from zobrist import hash_tabuleiro, atualizar, chave_tabela, espelhada
+
+PROF_PREVISAO = 2
+
+class Ponderador:
+    # busca no tempo do adversario: preve a resposta dele e aprofunda a posicao
+    # resultante ate ser parado; o que fica na tabela de transposicao e reaproveitado
+    # pela busca seguinte, acertando ou nao a previsao
+    def __init__(self):
+        self.thread = None
+        self.previsto = None
+        self.mov = None
+        self.prof = 0
+
+    def iniciar(self, board, maximizando):
+        self.parar()
+        self.previsto = None
+        self.mov = None
+        self.prof = 0
+        if transposicao.TABELA is not None:
+            transposicao.TABELA.nova_busca(historico_chave())
+        self.thread = threading.Thread(
+            target=self._ponderar, args=(copia_tabuleiro(board), maximizando), daemon=True
+        )
+        self.thread.start()
+
+    def _prever(self, board, maximizando, h):
+        tabela = transposicao.TABELA
+        if tabela is not None:
+            entrada = tabela.consultar(chave_tabela(h, maximizando))
+            if entrada is not None and entrada[3] is not None:
+                return espelhar_movimento(entrada[3]) if espelhada(h) else entrada[3]
+        _, mov = minimax(board, PROF_PREVISAO, maximizando, h=h)
+        return mov
+
+    def _ponderar(self, board, maximizando):
+        mm.PRAZO = math.inf
+        try:
+            h = hash_tabuleiro(board)
+            resposta = self._prever(board, maximizando, h)
+            if resposta is None:
+                return
+            motor_de(board).fazer_movimento(board, resposta)
+            h = atualizar(h, resposta, 'o' if maximizando else 'c')
+            self.previsto = h
+            mov = None
+            for prof in range(1, PROF_MAXIMA + 1):
+                _, mov = minimax(copia_tabuleiro(board), prof, not maximizando, h=h, primeiro=mov)
+                if mov is None:
+                    break
+                self.mov, self.prof = mov, prof
+        except TempoEsgotado:
+            pass
+        finally:
+            mm.PRAZO = None
+
+    def parar(self):
+        if self.thread is None:
+            return
+        mm.CANCELADO = True
+        self.thread.join()
+        mm.CANCELADO = False
+        self.thread = None
+
+    def acertou(self, board):
+        return self.previsto is not None and hash_tabuleiro(board) == self.previsto
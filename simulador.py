@@ -0,0 +1,184 @@
+import argparse, random, time
+import minimax as mm
+import ordenacao
+import transposicao
+import avaliacao
+from collections import deque
+from minimax import minimax, format_move
+from busca import busca_iterativa
+from movimentos import aplicar_movimento, count_pieces, gerar_movimentos
+from transposicao import TabelaTransposicao
+from utils import RECENT_BOARDS, RECENT_STATES_MAX, historico_chave
+from zobrist import hash_tabuleiro
+import bitboard
+
+MAX_JOGADAS = 300
+
+TABULEIRO_INICIAL = [
+    "#######",
+    "#ccccc#",
+    "#ccccc#",
+    "#ccocc#",
+    "#-----#",
+    "#-----#",
+    "# --- #",
+    "#- - -#",
+    "#######",
+]
+
+def tabuleiro_inicial():
+    return [list(linha) for linha in TABULEIRO_INICIAL]
+
+INICIAL = bitboard.de_tabuleiro(tabuleiro_inicial())
+CASA_ONCA_INICIAL = INICIAL.onca.bit_length() - 1
+
+def abertura(board):
+    # posicao inicial ou depois do primeiro lance da onca: o que cada lado ve ao comecar uma partida
+    pos = board if type(board) is bitboard.Posicao else bitboard.de_tabuleiro(board)
+    if pos.caes != INICIAL.caes:
+        return False
+    return pos.onca == INICIAL.onca or pos.onca.bit_length() - 1 in bitboard.PASSOS_ONCA[CASA_ONCA_INICIAL]
+
+def reiniciar_estado(tt):
+    # TT nova e killers/historia/repeticoes zerados: buscas reprodutiveis (benchmark, gravacao)
+    transposicao.configurar(tt)
+    for slots in ordenacao.KILLERS:
+        slots[0] = slots[1] = None
+    ordenacao.HISTORIA.clear()
+    ordenacao.CACHE_SEGURANCA.clear()
+    RECENT_BOARDS.clear()
+    random.seed(0)
+
+class Jogador:
+    # estado que no jogo real vive num processo main.py por lado: tabela de
+    # transposicao, killers/historia e RECENT_BOARDS. E trocado nos modulos a cada lance.
+    def __init__(self, lado, prof=4, tempo=None, motor="bitboard", seguranca=False, tt=1 << 18,
+                 pesos=None, pvs=False, cache=0):
+        self.lado = lado
+        self.prof = prof
+        self.tempo = tempo
+        self.motor = motor
+        self.seguranca = seguranca
+        self.tabela = TabelaTransposicao(tt) if tt > 0 else None
+        self.killers = [[None, None] for _ in range(ordenacao.MAX_PLY)]
+        self.historia = {}
+        self.recentes = deque(maxlen=RECENT_STATES_MAX)
+        # pesos da avaliacao e cache proprios: os dois lados podem usar pesos diferentes
+        self.pesos = dict(avaliacao.pesos(), **(pesos or {}))
+        self.pvs = pvs
+        self.cache = avaliacao.CacheAvaliacao(cache) if cache > 0 else None
+        self.nos = 0
+        self.segundos = 0.0
+        self.lances = 0
+        # dados do ultimo lance, para a gravacao da partida
+        self.valor = None
+        self.prof_lance = 0
+        self.nos_lance = 0
+        self.segundos_lance = 0.0
+
+    def _ativar(self):
+        transposicao.TABELA = self.tabela
+        ordenacao.KILLERS = self.killers
+        ordenacao.HISTORIA = self.historia
+        ordenacao.USAR_SEGURANCA = self.seguranca
+        mm.PVS = self.pvs
+        avaliacao.CACHE = None
+        avaliacao.aplicar_pesos(self.pesos)
+        avaliacao.CACHE = self.cache
+        RECENT_BOARDS.clear()
+        RECENT_BOARDS.extend(self.recentes)
+
+    def jogar(self, board):
+        self._ativar()
+        if self.motor == "bitboard":
+            board = bitboard.de_tabuleiro(board)
+        if self.tabela is not None:
+            self.tabela.nova_busca(historico_chave())
+        ordenacao.nova_busca()
+        nos = mm.NOS
+        inicio = time.perf_counter()
+        if self.tempo is not None:
+            self.valor, mov, self.prof_lance = busca_iterativa(board, self.lado == 'o', self.tempo, self.prof)
+        else:
+            self.valor, mov = minimax(board, self.prof, self.lado == 'o')
+            self.prof_lance = self.prof
+        self.segundos_lance = time.perf_counter() - inicio
+        self.nos_lance = mm.NOS - nos
+        self.segundos += self.segundos_lance
+        self.nos += self.nos_lance
+        self.lances += 1
+        if mov:
+            self.recentes.append(hash_tabuleiro(board))
+        return mov
+
+def resultado(board):
+    onca, cachorros = count_pieces(board)
+    if cachorros <= 5:
+        return 'o'
+    if onca == 0 or not gerar_movimentos(board, 'o'):
+        return 'c'
+    return None
+
+def jogar_partida(onca, caes, semente=0, max_jogadas=MAX_JOGADAS, board=None, lado='o', gravador=None):
+    random.seed(semente)
+    board = tabuleiro_inicial() if board is None else board
+    lances = []
+    vencedor = None
+    for _ in range(max_jogadas):
+        vencedor = resultado(board)
+        if vencedor:
+            break
+        jogador = onca if lado == 'o' else caes
+        if not gerar_movimentos(board, lado):
+            vencedor = 'o' if lado == 'c' else 'c'
+            break
+        mov = jogador.jogar(board)
+        if mov is None:
+            vencedor = 'o' if lado == 'c' else 'c'
+            break
+        if gravador is not None:
+            gravador.lance(board, lado, mov, jogador.valor, jogador.prof_lance, jogador.nos_lance,
+                           jogador.segundos_lance)
+        board = aplicar_movimento(board, mov)
+        lances.append(format_move(mov, lado).strip())
+        lado = 'c' if lado == 'o' else 'o'
+    else:
+        vencedor = resultado(board)
+    if gravador is not None:
+        gravador.fim(vencedor)
+    return {"vencedor": vencedor, "jogadas": len(lances), "lances": lances, "tabuleiro": board}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-partidas", type=int, default=1)
+    parser.add_argument("-semente", type=int, default=0)
+    parser.add_argument("-prof-onca", type=int, default=4)
+    parser.add_argument("-prof-caes", type=int, default=4)
+    parser.add_argument("-tempo-onca", type=float, default=None)
+    parser.add_argument("-tempo-caes", type=float, default=None)
+    parser.add_argument("-max-jogadas", type=int, default=MAX_JOGADAS)
+    parser.add_argument("-lances", action="store_true")
+    # acrescenta as partidas a uma gravacao binaria (gravacao.py)
+    parser.add_argument("-gravar", default=None)
+    args = parser.parse_args()
+    placar = {'o': 0, 'c': 0, None: 0}
+    for i in range(args.partidas):
+        onca = Jogador('o', args.prof_onca, args.tempo_onca)
+        caes = Jogador('c', args.prof_caes, args.tempo_caes)
+        gravador = None
+        if args.gravar:
+            from gravacao import Gravador
+            gravador = Gravador(args.gravar)
+        partida = jogar_partida(onca, caes, args.semente + i, args.max_jogadas, gravador=gravador)
+        if gravador is not None:
+            gravador.fechar()
+        placar[partida["vencedor"]] += 1
+        print(f"partida {i} semente {args.semente + i}: vencedor {partida['vencedor'] or 'empate'} "
+              f"em {partida['jogadas']} jogadas")
+        if args.lances:
+            for lance in partida["lances"]:
+                print(f"  {lance}")
+    print(f"onca {placar['o']} caes {placar['c']} empates {placar[None]}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+import argparse, mmap, os, struct
+from array import array
+from itertools import combinations
+from math import comb
+from bitboard import NUM_CASAS, CASAS, BIT, ESPELHO, PASSOS_ONCA, PASSOS_CAO, SALTOS, bits, de_tabuleiro, espelhar_mascara, Posicao
+
+# com LIMIAR caes ou menos a onca ja venceu (mesma regra de minimax)
+LIMIAR = 5
+MAGICO = b'JOTB'
+VERSAO = 2
+CABECALHO = struct.Struct('<4sHBB')
+# cada posicao ocupa um byte: 0 = empate/desconhecido, 1 + 2n = onca vence em n lances,
+# 2 + 2n = caes vencem em n lances (n limitado a DIST_MAX)
+DIST_MAX = 126
+
+PRED_ONCA = [[o for o in range(NUM_CASAS) if d in PASSOS_ONCA[o]] for d in range(NUM_CASAS)]
+PRED_CAO = [[o for o in range(NUM_CASAS) if d in PASSOS_CAO[o]] for d in range(NUM_CASAS)]
+COMB = [[comb(n, r) for r in range(NUM_CASAS)] for n in range(NUM_CASAS)]
+# so posicoes canonicas (onca na metade esquerda ou no centro) sao guardadas; as casas
+# da onca nessa metade sao renumeradas 0..NUM_ONCA-1
+CASAS_ONCA = [i for i, (l, c) in enumerate(CASAS) if c <= 3]
+NUM_ONCA = len(CASAS_ONCA)
+NUMERO_ONCA = {casa: n for n, casa in enumerate(CASAS_ONCA)}
+
+TABELAS = {}
+DIRETORIO = None
+
+def codificar(vence_onca, n):
+    return (1 if vence_onca else 2) + 2 * min(n, DIST_MAX)
+
+def decodificar(codigo):
+    if codigo == 0:
+        return None
+    return codigo & 1 == 1, (codigo - 1) // 2
+
+def num_posicoes(cachorros):
+    return 2 * NUM_ONCA * COMB[NUM_CASAS - 1][cachorros]
+
+def canonica(onca, caes):
+    # onca na coluna 4-5 vai para a imagem; na coluna 3 decide a menor mascara dos caes
+    c = CASAS[onca][1]
+    if c > 3:
+        return ESPELHO[onca], espelhar_mascara(caes)
+    if c == 3:
+        espelho = espelhar_mascara(caes)
+        if espelho < caes:
+            return onca, espelho
+    return onca, caes
+
+def indice(onca, caes, vez_onca, cachorros):
+    # posicao dos caes no sistema combinatorio, numerando as casas sem a da onca
+    onca, caes = canonica(onca, caes)
+    r = 0
+    i = 1
+    for casa in bits(caes):
+        r += COMB[casa - 1 if casa > onca else casa][i]
+        i += 1
+    return ((0 if vez_onca else 1) * NUM_ONCA + NUMERO_ONCA[onca]) * COMB[NUM_CASAS - 1][cachorros] + r
+
+def _saltos(casa, caes, resultado):
+    folha = True
+    for meio, destino in SALTOS[casa]:
+        if caes & BIT[meio] and not caes & BIT[destino]:
+            folha = False
+            _saltos(destino, caes & ~BIT[meio], resultado)
+    if not folha:
+        return
+    resultado.add((casa, caes))
+
+def saltos_onca(onca, caes):
+    resultado = set()
+    _saltos(onca, caes, resultado)
+    resultado.discard((onca, caes))
+    return resultado
+
+def passos_onca(onca, caes):
+    return [d for d in PASSOS_ONCA[onca] if not caes & BIT[d]]
+
+def num_movimentos_caes(onca, caes):
+    ocupadas = caes | BIT[onca]
+    n = 0
+    for casa in bits(caes):
+        for d in PASSOS_CAO[casa]:
+            if not ocupadas & BIT[d]:
+                n += 1
+    return n
+
+class Tablebase:
+    def __init__(self, caminho):
+        self.arquivo = open(caminho, 'rb')
+        self.dados = mmap.mmap(self.arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, versao, self.cachorros, limiar = CABECALHO.unpack_from(self.dados, 0)
+        if magico != MAGICO or versao != VERSAO or limiar != LIMIAR:
+            raise ValueError(f"tablebase incompativel: {caminho}")
+        if len(self.dados) != CABECALHO.size + num_posicoes(self.cachorros):
+            raise ValueError(f"tablebase truncada: {caminho}")
+
+    def valor(self, onca, caes, vez_onca):
+        return self.dados[CABECALHO.size + indice(onca, caes, vez_onca, self.cachorros)]
+
+    def fechar(self):
+        self.dados.close()
+        self.arquivo.close()
+
+def nome_arquivo(diretorio, cachorros):
+    return os.path.join(diretorio, f"tb{cachorros}.bin")
+
+def carregar(diretorio):
+    global DIRETORIO
+    DIRETORIO = diretorio
+    for nome in sorted(os.listdir(diretorio)):
+        if nome.startswith("tb") and nome.endswith(".bin"):
+            tabela = Tablebase(os.path.join(diretorio, nome))
+            TABELAS[tabela.cachorros] = tabela
+    return TABELAS
+
+def consultar(board, maximizando):
+    pos = board if type(board) is Posicao else de_tabuleiro(board)
+    tabela = TABELAS.get(pos.caes.bit_count())
+    if tabela is None or not pos.onca:
+        return None
+    onca = pos.onca.bit_length() - 1
+    return decodificar(tabela.valor(onca, pos.caes, maximizando))
+
+def gerar(cachorros, menores, limiar=LIMIAR):
+    # analise retrograda: terminais na distancia 0; cada posicao resolvida e propagada
+    # aos predecessores (lances sem captura, que mantem o numero de caes). Quem move e
+    # vence se algum filho vence para ele; perde quando todos os filhos perdem.
+    # Capturas caem em tabelas menores, ja resolvidas em `menores` (cachorros -> valor).
+    total = num_posicoes(cachorros)
+    valores = bytearray(total)
+    pendentes = bytearray(total)
+    perda = bytearray(total)
+    baldes = {}
+
+    def empilhar(n, onca, caes, vez_onca, vence_quem_move):
+        balde = baldes.get(n)
+        if balde is None:
+            balde = baldes[n] = array('Q')
+        balde.append(caes | onca << 31 | vez_onca << 36 | vence_quem_move << 37)
+
+    for onca in CASAS_ONCA:
+        outras = [c for c in range(NUM_CASAS) if c != onca]
+        for combinacao in combinations(outras, cachorros):
+            caes = 0
+            for casa in combinacao:
+                caes |= BIT[casa]
+            if canonica(onca, caes) != (onca, caes):
+                continue
+            passos = passos_onca(onca, caes)
+            saltos = saltos_onca(onca, caes)
+            if not passos and not saltos:
+                empilhar(0, onca, caes, 1, 0)
+                empilhar(0, onca, caes, 0, 1)
+                continue
+            n = num_movimentos_caes(onca, caes)
+            if n == 0:
+                empilhar(0, onca, caes, 0, 0)
+            else:
+                pendentes[indice(onca, caes, False, cachorros)] = n
+            contador = len(passos)
+            vitoria = None
+            perda_max = 0
+            for destino, restantes in saltos:
+                k = restantes.bit_count()
+                if k <= limiar:
+                    resultado = (True, 0)
+                else:
+                    resultado = decodificar(menores[k](destino, restantes, False))
+                if resultado is None or resultado[0]:
+                    # so filhos perdidos descontam do contador; este nunca sera
+                    contador += 1
+                if resultado is None:
+                    continue
+                if resultado[0]:
+                    vitoria = resultado[1] + 1 if vitoria is None else min(vitoria, resultado[1] + 1)
+                else:
+                    perda_max = max(perda_max, resultado[1] + 1)
+            i = indice(onca, caes, True, cachorros)
+            pendentes[i] = contador
+            perda[i] = min(perda_max, 255)
+            if vitoria is not None:
+                empilhar(vitoria, onca, caes, 1, 1)
+            elif contador == 0:
+                empilhar(perda_max, onca, caes, 1, 0)
+
+    n = 0
+    while baldes:
+        balde = baldes.pop(n, None)
+        n += 1
+        if balde is None:
+            continue
+        dist = n - 1
+        for empacotado in balde:
+            caes = empacotado & 0x7fffffff
+            onca = empacotado >> 31 & 31
+            vez_onca = empacotado >> 36 & 1
+            vence_quem_move = empacotado >> 37 & 1
+            i = indice(onca, caes, vez_onca, cachorros)
+            if valores[i]:
+                continue
+            vence_onca = vez_onca == vence_quem_move
+            valores[i] = codificar(vence_onca, dist)
+            # os lances que chegam na imagem espelhada tambem chegam nesta posicao; cada
+            # um desconta uma vez, e so do predecessor canonico (o que tem contador)
+            imagens = [(onca, caes)]
+            espelho = (ESPELHO[onca], espelhar_mascara(caes))
+            if espelho != imagens[0]:
+                imagens.append(espelho)
+            predecessores = []
+            for onca_i, caes_i in imagens:
+                if vez_onca:
+                    ocupadas = caes_i | BIT[onca_i]
+                    for destino in bits(caes_i):
+                        for origem in PRED_CAO[destino]:
+                            if not ocupadas & BIT[origem]:
+                                predecessores.append((onca_i, caes_i ^ BIT[destino] ^ BIT[origem]))
+                else:
+                    predecessores += [(origem, caes_i) for origem in PRED_ONCA[onca_i] if not caes_i & BIT[origem]]
+            vez_pred = 1 - vez_onca
+            for onca_p, caes_p in predecessores:
+                if canonica(onca_p, caes_p) != (onca_p, caes_p):
+                    continue
+                j = indice(onca_p, caes_p, vez_pred, cachorros)
+                if valores[j]:
+                    continue
+                if vence_onca == (vez_pred == 1):
+                    empilhar(n, onca_p, caes_p, vez_pred, 1)
+                else:
+                    pendentes[j] -= 1
+                    if n > perda[j]:
+                        perda[j] = min(n, 255)
+                    if pendentes[j] == 0:
+                        empilhar(perda[j], onca_p, caes_p, vez_pred, 0)
+    return valores
+
+def salvar(caminho, cachorros, valores, limiar=LIMIAR):
+    with open(caminho, 'wb') as f:
+        f.write(CABECALHO.pack(MAGICO, VERSAO, cachorros, limiar))
+        f.write(valores)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cachorros", type=int)
+    parser.add_argument("-dir", default="tablebase")
+    args = parser.parse_args()
+    os.makedirs(args.dir, exist_ok=True)
+    menores = {}
+    for k in range(LIMIAR + 1, args.cachorros + 1):
+        caminho = nome_arquivo(args.dir, k)
+        if not os.path.exists(caminho):
+            print(f"gerando {k} caes ({num_posicoes(k)} posicoes)")
+            salvar(caminho, k, gerar(k, menores))
+        menores[k] = Tablebase(caminho).valor
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import asyncio, threading, unittest
+from collections import defaultdict, deque
+import transporte
+
+# servidor RESP minimo no lugar do redis do controlador: so RPUSH e BLPOP (com espera),
+# rodando num loop asyncio em outra thread
+
+def _codificar(valor):
+    if valor is None:
+        return b"*-1\r\n"
+    if isinstance(valor, int):
+        return b":%d\r\n" % valor
+    if isinstance(valor, list):
+        return b"*%d\r\n" % len(valor) + b"".join(_codificar(v) for v in valor)
+    return b"$%d\r\n%s\r\n" % (len(valor), valor)
+
+async def _ler_comando(reader):
+    n = int((await reader.readuntil(b"\r\n"))[1:-2])
+    partes = []
+    for _ in range(n):
+        tamanho = int((await reader.readuntil(b"\r\n"))[1:-2])
+        partes.append((await reader.readexactly(tamanho + 2))[:-2])
+    return partes
+
+class RedisFalso:
+    def __init__(self):
+        self.listas = defaultdict(deque)
+        self.esperando = defaultdict(deque)
+        self.conexoes = 0
+        self.comandos = []
+        self.clientes = set()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.servidor = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._cliente, "127.0.0.1", 0), self.loop).result()
+        self.porta = self.servidor.sockets[0].getsockname()[1]
+
+    def fechar(self):
+        async def parar():
+            # clientes ainda presos num BLPOP
+            for tarefa in self.clientes:
+                tarefa.cancel()
+            await asyncio.gather(*self.clientes, return_exceptions=True)
+            self.servidor.close()
+            await self.servidor.wait_closed()
+        asyncio.run_coroutine_threadsafe(parar(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def _rpush(self, chave, valor):
+        espera = self.esperando[chave]
+        while espera:
+            futuro = espera.popleft()
+            if not futuro.done():
+                futuro.set_result(valor)
+                return
+        self.listas[chave].append(valor)
+
+    def empurrar(self, chave, valor):
+        # o controlador publicando um tabuleiro
+        self.loop.call_soon_threadsafe(self._rpush, chave.encode(), valor.encode())
+
+    def lista(self, chave):
+        return asyncio.run_coroutine_threadsafe(self._lista(chave.encode()), self.loop).result()
+
+    async def _lista(self, chave):
+        return [v.decode() for v in self.listas[chave]]
+
+    async def _cliente(self, reader, writer):
+        self.conexoes += 1
+        self.clientes.add(asyncio.current_task())
+        try:
+            while True:
+                partes = await _ler_comando(reader)
+                nome = partes[0].upper()
+                self.comandos.append(nome.decode())
+                if nome == b"RPUSH":
+                    for valor in partes[2:]:
+                        self._rpush(partes[1], valor)
+                    writer.write(_codificar(len(self.listas[partes[1]])))
+                elif nome == b"BLPOP":
+                    chave = partes[1]
+                    if self.listas[chave]:
+                        valor = self.listas[chave].popleft()
+                    else:
+                        futuro = self.loop.create_future()
+                        self.esperando[chave].append(futuro)
+                        valor = await futuro
+                    writer.write(_codificar([chave, valor]))
+                else:
+                    writer.write(b"-ERR comando desconhecido\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+TABULEIRO = "o\n#######\n#ccccc#\n#ccccc#\n#ccocc#\n#-----#\n#-----#\n# --- #\n#- - -#\n#######\n"
+
+class TesteConexao(unittest.TestCase):
+    def setUp(self):
+        self.redis = RedisFalso()
+        self.conexao = transporte.Conexao("o", "127.0.0.1", self.redis.porta)
+
+    def tearDown(self):
+        self.conexao.fechar()
+        self.redis.fechar()
+
+    def test_envia_e_recebe_na_mesma_conexao(self):
+        buf = self.conexao.buf
+        for n in range(5):
+            self.conexao.envia(f"o m 3 3 4 {n}\n")
+            self.redis.empurrar("tabuleiro_o", TABULEIRO)
+            self.assertEqual(self.conexao.recebe(), TABULEIRO)
+        self.assertEqual(self.redis.lista("jogada_o"), [f"o m 3 3 4 {n}\n" for n in range(5)])
+        self.assertEqual(self.redis.conexoes, 1)
+        self.assertIs(self.conexao.buf, buf)
+        self.assertEqual(self.conexao.ini, self.conexao.fim)
+
+    def test_mensagem_maior_que_o_buffer(self):
+        grande = TABULEIRO * (3 * transporte.BUF_SIZE // len(TABULEIRO))
+        buf = self.conexao.buf
+        self.redis.empurrar("tabuleiro_o", grande)
+        self.redis.empurrar("tabuleiro_o", TABULEIRO)
+        self.assertEqual(self.conexao.recebe(), grande)
+        self.assertEqual(self.conexao.recebe(), TABULEIRO)
+        # cresce no lugar, sem trocar de buffer
+        self.assertIs(self.conexao.buf, buf)
+        self.assertGreater(len(buf), transporte.BUF_SIZE)
+
+    def test_recebe_com_timeout(self):
+        self.assertIsNone(self.conexao.recebe(timeout=0.05))
+        self.assertIsNone(self.conexao.recebe(timeout=0.05))
+        self.redis.empurrar("tabuleiro_o", TABULEIRO)
+        self.assertEqual(self.conexao.recebe(timeout=2), TABULEIRO)
+        # o BLPOP que ficou pendente e reaproveitado, nao reenviado
+        self.assertEqual(self.redis.comandos, ["BLPOP"])
+
+    def test_envia_depois_do_timeout(self):
+        self.assertIsNone(self.conexao.recebe(timeout=0.05))
+        self.conexao.envia("o m 3 3 4 3\n")
+        self.assertEqual(self.redis.lista("jogada_o"), ["o m 3 3 4 3\n"])
+        self.redis.empurrar("tabuleiro_o", TABULEIRO)
+        # o tabuleiro e a resposta do BLPOP pendente, nao foi engolido pelo RPUSH
+        self.assertEqual(self.conexao.recebe(timeout=2), TABULEIRO)
+        self.assertEqual(self.redis.comandos, ["BLPOP", "RPUSH"])
+        self.assertIsNone(self.conexao.recebe(timeout=0.05))
+        with self.assertRaises(transporte.ErroRedis):
+            self.conexao.executar("RPUSH", "jogada_o", "x")
+
+    def test_erro_do_servidor(self):
+        with self.assertRaises(transporte.ErroRedis):
+            self.conexao.executar("GET", "x")
+
+class TesteConexaoAsync(unittest.TestCase):
+    def setUp(self):
+        self.redis = RedisFalso()
+
+    def tearDown(self):
+        self.redis.fechar()
+
+    def test_ida_e_volta(self):
+        async def partida():
+            conexao = await transporte.ConexaoAsync.abrir("c", "127.0.0.1", self.redis.porta)
+            try:
+                await conexao.envia("c m 2 1 3 1\n")
+                self.redis.empurrar("tabuleiro_c", TABULEIRO)
+                return await conexao.recebe()
+            finally:
+                await conexao.fechar()
+        self.assertEqual(asyncio.run(partida()), TABULEIRO)
+        self.assertEqual(self.redis.lista("jogada_c"), ["c m 2 1 3 1\n"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import argparse, json, math, time
+import numpy as np
+import avaliacao
+import bitboard
+import caracteristicas
+import gravacao
+from minimax import ler_movimento
+from simulador import tabuleiro_inicial
+
+# ajuste dos pesos W_* pelo metodo de Texel: o resultado da partida (1 onca, 0 caes,
+# 0.5 empate) e previsto por sigmoid(K * avaliacao) de cada posicao jogada, e os pesos
+# sao os que minimizam o erro quadratico medio. As caracteristicas saem de uma vez por
+# caracteristicas.extrair, e cada passo do ajuste e so um produto de matriz
+
+RESULTADO = {'o': 1.0, 'c': 0.0, None: 0.5}
+# intervalo de log10(K) em ajustar_k
+LIMITES_K = (-12.0, 0.0)
+
+def _partidas(caminho):
+    # (resultado, mascaras de cada posicao) das partidas de um JSONL do torneio ou de uma gravacao binaria
+    with open(caminho, 'rb') as f:
+        binario = f.read(len(gravacao.MAGICO)) == gravacao.MAGICO
+    if binario:
+        g = gravacao.Gravacao(caminho)
+        for vencedor, lances in g.partidas():
+            yield RESULTADO[vencedor], [(j.onca, j.caes) for j in lances]
+        g.fechar()
+        return
+    with open(caminho) as f:
+        for linha in f:
+            partida = json.loads(linha)
+            pos = bitboard.de_tabuleiro(tabuleiro_inicial())
+            mascaras = []
+            for lance in partida["lances"]:
+                mascaras.append((pos.onca, pos.caes))
+                bitboard.fazer_movimento(pos, ler_movimento(lance))
+            yield RESULTADO[partida["vencedor"]], mascaras
+
+def posicoes(caminhos, pular=0):
+    # posicoes (matriz de casas) e resultado da partida de cada uma
+    oncas, caes, resultados = [], [], []
+    for caminho in caminhos:
+        for resultado, mascaras in _partidas(caminho):
+            for onca, c in mascaras[pular:]:
+                if onca:
+                    oncas.append(onca)
+                    caes.append(c)
+                    resultados.append(resultado)
+    return caracteristicas.de_mascaras(oncas, caes), np.array(resultados)
+
+def sigmoid(z):
+    return 0.5 * (1 + np.tanh(0.5 * z))
+
+def erro(f, y, pesos, k):
+    return float(np.mean((y - sigmoid(k * (f @ pesos))) ** 2))
+
+def ajustar_k(f, y, pesos, passos=60):
+    # busca pela razao aurea em log10(K): as avaliacoes vao a milhoes, K e bem pequeno.
+    # Sem resultados diferentes (so empates, por exemplo) o erro e minimo em K -> 0, a busca
+    # para no limite e o passo de ajustar (1 / K) explode: nesses casos nao ha ajuste
+    if not len(y) or y.min() == y.max():
+        raise ValueError("todas as posicoes tem o mesmo resultado: nao ha o que ajustar")
+    a, b = LIMITES_K
+    razao = (math.sqrt(5) - 1) / 2
+    for _ in range(passos):
+        c, d = b - razao * (b - a), a + razao * (b - a)
+        if erro(f, y, pesos, 10 ** c) < erro(f, y, pesos, 10 ** d):
+            b = d
+        else:
+            a = c
+    k = (a + b) / 2
+    if min(k - LIMITES_K[0], LIMITES_K[1] - k) < 1e-3:
+        raise ValueError(f"K parou no limite da busca (10^{k:.3g}): as avaliacoes nao explicam os resultados")
+    return 10 ** k
+
+def ajustar(f, y, pesos, k, iteracoes=500, passo=0.02, fixos=()):
+    # Adam com o passo de cada peso medido em desvios padrao do termo (K * peso * caracteristica),
+    # para W_CAPTURE e W_DOG_ADVANCE andarem na mesma escala
+    escala = f.std(axis=0)
+    livres = (escala > 0) & ~np.isin(caracteristicas.PESOS, list(fixos))
+    escala = np.where(livres, 1 / (k * np.where(escala > 0, escala, 1)), 0)
+    pesos = pesos.copy()
+    m = np.zeros_like(pesos)
+    v = np.zeros_like(pesos)
+    b1, b2 = 0.9, 0.999
+    for t in range(1, iteracoes + 1):
+        p = sigmoid(k * (f @ pesos))
+        g = -2 * k * (f.T @ ((y - p) * p * (1 - p))) / len(y) * livres
+        m = b1 * m + (1 - b1) * g
+        v = b2 * v + (1 - b2) * g * g
+        pesos -= passo * escala * (m / (1 - b1 ** t)) / (np.sqrt(v / (1 - b2 ** t)) + 1e-12)
+    return pesos
+
+def exportar(pesos, caminho):
+    # no formato de avaliacao.carregar_pesos (main.py -pesos, torneio.py "pesos")
+    with open(caminho, "w") as f:
+        json.dump({nome: round(float(p), 2) for nome, p in zip(caracteristicas.PESOS, pesos)}, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("partidas", nargs="+", help="JSONL do torneio ou gravacao binaria")
+    parser.add_argument("-pular", type=int, default=4, help="lances de abertura ignorados em cada partida")
+    parser.add_argument("-pesos", default=None, help="pesos iniciais (JSON); sem ele, os de avaliacao.py")
+    parser.add_argument("-iteracoes", type=int, default=500)
+    parser.add_argument("-passo", type=float, default=0.02)
+    parser.add_argument("-fixos", nargs="*", default=[], help="pesos que nao sao ajustados")
+    parser.add_argument("-saida", default="pesos.json")
+    args = parser.parse_args()
+    if args.pesos:
+        avaliacao.carregar_pesos(args.pesos)
+    desconhecidos = set(args.fixos) - set(caracteristicas.PESOS)
+    if desconhecidos:
+        raise ValueError(f"pesos desconhecidos: {sorted(desconhecidos)}")
+    inicio = time.perf_counter()
+    x, y = posicoes(args.partidas, args.pular)
+    print(f"{len(y)} posicoes lidas em {time.perf_counter() - inicio:.1f}s")
+    inicio = time.perf_counter()
+    f = caracteristicas.extrair(x)
+    print(f"caracteristicas extraidas em {time.perf_counter() - inicio:.1f}s")
+    pesos = caracteristicas.vetor_pesos()
+    k = ajustar_k(f, y, pesos)
+    antes = erro(f, y, pesos, k)
+    inicio = time.perf_counter()
+    novos = ajustar(f, y, pesos, k, args.iteracoes, args.passo, args.fixos)
+    print(f"K {k:.3g}: erro {antes:.6f} -> {erro(f, y, novos, k):.6f} em {time.perf_counter() - inicio:.1f}s")
+    for nome, p0, p1 in zip(caracteristicas.PESOS, pesos, novos):
+        print(f"  {nome:<26} {p0:>12.2f} -> {p1:>12.2f}")
+    exportar(novos, args.saida)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import argparse, hashlib, itertools, json, math, os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import avaliacao
+import tablebase
+from simulador import Jogador, jogar_partida, MAX_JOGADAS
+
+# campos de uma configuracao e seus valores padrao
+PADRAO = {"prof": 4, "tempo": None, "motor": "bitboard", "pvs": False, "seguranca": False, "pesos": {}}
+Z_95 = 1.96
+
+def ler_configuracoes(caminho):
+    # JSON {nome: {prof, tempo, motor, pvs, seguranca, pesos}}; pesos pode ser o caminho de outro JSON
+    with open(caminho) as f:
+        brutas = json.load(f)
+    configuracoes = {}
+    for nome, cfg in brutas.items():
+        desconhecidos = set(cfg) - set(PADRAO)
+        if desconhecidos:
+            raise ValueError(f"{nome}: campos desconhecidos {sorted(desconhecidos)}")
+        cfg = dict(PADRAO, **cfg)
+        if isinstance(cfg["pesos"], str):
+            with open(os.path.join(os.path.dirname(caminho), cfg["pesos"])) as f:
+                cfg["pesos"] = json.load(f)
+        desconhecidos = set(cfg["pesos"]) - set(avaliacao.NOMES_PESOS)
+        if desconhecidos:
+            raise ValueError(f"{nome}: pesos desconhecidos {sorted(desconhecidos)}")
+        configuracoes[nome] = cfg
+    if len(configuracoes) < 2:
+        raise ValueError("o torneio precisa de pelo menos duas configuracoes")
+    return configuracoes
+
+def assinatura(cfg):
+    # identifica a configuracao nos resultados gravados, para nao reaproveitar partidas de outra versao
+    return hashlib.sha1(json.dumps(cfg, sort_keys=True).encode()).hexdigest()[:12]
+
+def _inicializar(diretorio_tablebase):
+    if diretorio_tablebase:
+        tablebase.carregar(diretorio_tablebase)
+
+def _jogador(lado, cfg, tt, cache):
+    return Jogador(lado, cfg["prof"], cfg["tempo"], cfg["motor"], cfg["seguranca"], tt,
+                   pesos=cfg["pesos"], pvs=cfg["pvs"], cache=cache)
+
+def _partida(nome_onca, cfg_onca, nome_caes, cfg_caes, semente, max_jogadas, tt, cache):
+    onca = _jogador('o', cfg_onca, tt, cache)
+    caes = _jogador('c', cfg_caes, tt, cache)
+    partida = jogar_partida(onca, caes, semente, max_jogadas)
+    return {
+        "onca": nome_onca, "caes": nome_caes, "semente": semente,
+        "assinaturas": [assinatura(cfg_onca), assinatura(cfg_caes)],
+        "vencedor": partida["vencedor"], "jogadas": partida["jogadas"],
+        "estatisticas": {lado: {"nos": j.nos, "segundos": round(j.segundos, 4), "lances": j.lances}
+                         for lado, j in (('o', onca), ('c', caes))},
+        "lances": partida["lances"],
+    }
+
+def emparelhamentos(configuracoes, partidas, semente):
+    # todos contra todos; cada semente e jogada com os dois lados trocados
+    for a, b in itertools.combinations(configuracoes, 2):
+        for i in range(partidas):
+            yield a, b, semente + i
+            yield b, a, semente + i
+
+def ler_resultados(caminho, configuracoes):
+    # partidas ja gravadas cujas duas configuracoes continuam iguais
+    resultados = []
+    if not os.path.exists(caminho):
+        return resultados
+    with open(caminho) as f:
+        for linha in f:
+            r = json.loads(linha)
+            cfgs = [configuracoes.get(r["onca"]), configuracoes.get(r["caes"])]
+            if None not in cfgs and r["assinaturas"] == [assinatura(c) for c in cfgs]:
+                resultados.append(r)
+    return resultados
+
+def pontos(r):
+    # pontos da onca e dos caes numa partida
+    if r["vencedor"] is None:
+        return 0.5, 0.5
+    return (1.0, 0.0) if r["vencedor"] == 'o' else (0.0, 1.0)
+
+def elo(s):
+    if s <= 0:
+        return -math.inf
+    if s >= 1:
+        return math.inf
+    return 400 * math.log10(s / (1 - s))
+
+def intervalo(resultados):
+    # elo do placar medio com intervalo de 95% pelo erro padrao dos pontos por partida
+    n = len(resultados)
+    s = sum(resultados) / n
+    erro = math.sqrt(sum((p - s) ** 2 for p in resultados) / n / n)
+    return s, elo(s), elo(s - Z_95 * erro), elo(s + Z_95 * erro)
+
+def relatorio(resultados, configuracoes):
+    por_config = {nome: [] for nome in configuracoes}
+    por_par = {}
+    custo = {nome: {"nos": 0, "segundos": 0.0, "lances": 0} for nome in configuracoes}
+    for r in resultados:
+        po, pc = pontos(r)
+        por_config[r["onca"]].append(po)
+        por_config[r["caes"]].append(pc)
+        por_par.setdefault((r["onca"], r["caes"]), []).append(po)
+        por_par.setdefault((r["caes"], r["onca"]), []).append(pc)
+        for lado, nome in (('o', r["onca"]), ('c', r["caes"])):
+            for campo, valor in r["estatisticas"][lado].items():
+                custo[nome][campo] += valor
+    linhas = []
+    for nome, pts in sorted(por_config.items(), key=lambda item: -sum(item[1]) / max(len(item[1]), 1)):
+        c = custo[nome]
+        linha = {"nome": nome, "partidas": len(pts),
+                 "nos_por_lance": c["nos"] / c["lances"] if c["lances"] else 0.0,
+                 "ms_por_lance": 1000 * c["segundos"] / c["lances"] if c["lances"] else 0.0,
+                 "nos_por_segundo": c["nos"] / c["segundos"] if c["segundos"] else 0.0}
+        if pts:
+            linha["pontos"], linha["elo"], linha["elo_min"], linha["elo_max"] = intervalo(pts)
+        linhas.append(linha)
+    pares = []
+    for (a, b), pts in sorted(por_par.items()):
+        if a < b:
+            s, e, e_min, e_max = intervalo(pts)
+            pares.append({"a": a, "b": b, "partidas": len(pts), "pontos": s, "elo": e, "elo_min": e_min, "elo_max": e_max})
+    return linhas, pares
+
+def imprimir(linhas, pares):
+    print(f"{'configuracao':<16} {'partidas':>8} {'pontos':>7} {'elo':>7} {'ic 95%':>17} "
+          f"{'nos/lance':>10} {'ms/lance':>9} {'nos/s':>8}")
+    for l in linhas:
+        if "elo" not in l:
+            print(f"{l['nome']:<16} {0:>8}")
+            continue
+        print(f"{l['nome']:<16} {l['partidas']:>8} {l['pontos']:>7.3f} {l['elo']:>+7.0f} "
+              f"{'[' + format(l['elo_min'], '+.0f') + ', ' + format(l['elo_max'], '+.0f') + ']':>17} "
+              f"{l['nos_por_lance']:>10.0f} {l['ms_por_lance']:>9.1f} {l['nos_por_segundo']:>8.0f}")
+    print()
+    for p in pares:
+        print(f"{p['a']} x {p['b']}: {p['partidas']} partidas, pontos {p['pontos']:.3f}, "
+              f"elo {p['elo']:+.0f} [{p['elo_min']:+.0f}, {p['elo_max']:+.0f}]")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("configuracoes", help="JSON {nome: {prof, tempo, motor, pvs, seguranca, pesos}}")
+    parser.add_argument("-partidas", type=int, default=2, help="sementes por par de configuracoes e lado")
+    parser.add_argument("-semente", type=int, default=0)
+    parser.add_argument("-max-jogadas", type=int, default=MAX_JOGADAS)
+    parser.add_argument("-workers", type=int, default=os.cpu_count())
+    parser.add_argument("-tt", type=int, default=1 << 18)
+    parser.add_argument("-cache-avaliacao", type=int, default=1 << 16)
+    parser.add_argument("-tablebase", default=None)
+    # uma linha JSON por partida; as ja gravadas para as mesmas configuracoes nao sao jogadas de novo
+    parser.add_argument("-saida", default="torneio.jsonl")
+    parser.add_argument("-relatorio", default=None, help="grava tambem o relatorio em JSON")
+    args = parser.parse_args()
+    configuracoes = ler_configuracoes(args.configuracoes)
+    resultados = ler_resultados(args.saida, configuracoes)
+    feitas = {(r["onca"], r["caes"], r["semente"]) for r in resultados}
+    pendentes = [p for p in emparelhamentos(configuracoes, args.partidas, args.semente) if p not in feitas]
+    print(f"torneio: {len(resultados)} partidas gravadas, {len(pendentes)} a jogar com {args.workers} workers")
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_inicializar,
+                             initargs=(args.tablebase,)) as pool, open(args.saida, "a") as saida:
+        futuros = [pool.submit(_partida, a, configuracoes[a], b, configuracoes[b], semente,
+                               args.max_jogadas, args.tt, args.cache_avaliacao)
+                   for a, b, semente in pendentes]
+        for i, futuro in enumerate(as_completed(futuros), 1):
+            r = futuro.result()
+            saida.write(json.dumps(r) + "\n")
+            saida.flush()
+            resultados.append(r)
+            print(f"[{i}/{len(futuros)}] {r['onca']} (onca) x {r['caes']} (caes) semente {r['semente']}: "
+                  f"{r['vencedor'] or 'empate'} em {r['jogadas']} jogadas")
+    linhas, pares = relatorio(resultados, configuracoes)
+    imprimir(linhas, pares)
+    if args.relatorio:
+        with open(args.relatorio, "w") as f:
+            json.dump({"configuracoes": linhas, "pares": pares}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
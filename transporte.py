@@ -0,0 +1,176 @@
+import asyncio, select, socket
+
+# cliente RESP minimo para o controlador (redis): o lado envia lances com
+# RPUSH jogada_<lado> e espera tabuleiros com BLPOP tabuleiro_<lado> 0,
+# o mesmo protocolo da libtabuleiro, sem ctypes
+BUF_SIZE = 4096
+
+class ErroRedis(Exception):
+    pass
+
+def comando(*partes):
+    saida = [b"*%d\r\n" % len(partes)]
+    for p in partes:
+        if isinstance(p, str):
+            p = p.encode()
+        saida.append(b"$%d\r\n%s\r\n" % (len(p), p))
+    return b"".join(saida)
+
+class Conexao:
+    def __init__(self, lado, ip="127.0.0.1", porta=10001):
+        self.lado = lado
+        self.chave_jogada = f"jogada_{lado}"
+        self.chave_tabuleiro = f"tabuleiro_{lado}"
+        self.sock = socket.create_connection((ip, int(porta)))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # buffer de recepcao reaproveitado entre mensagens; [ini:fim] ainda nao foi lido
+        self.buf = bytearray(BUF_SIZE)
+        self.ini = 0
+        self.fim = 0
+        # BLPOP ja enviado cuja resposta ainda nao foi lida
+        self.pendente = False
+        # segunda conexao para os RPUSH feitos com um BLPOP pendente nesta
+        self.envio = None
+
+    def fechar(self):
+        if self.envio is not None:
+            self.envio.fechar()
+        self.sock.close()
+
+    def _encher(self, timeout=None):
+        if self.ini:
+            restante = self.fim - self.ini
+            self.buf[:restante] = self.buf[self.ini:self.fim]
+            self.ini, self.fim = 0, restante
+        if self.fim == len(self.buf):
+            self.buf.extend(bytes(len(self.buf)))
+        if timeout is not None:
+            prontos, _, _ = select.select([self.sock], [], [], timeout)
+            if not prontos:
+                return False
+        n = self.sock.recv_into(memoryview(self.buf)[self.fim:])
+        if n == 0:
+            raise ConnectionError("controlador fechou a conexao")
+        self.fim += n
+        return True
+
+    def _linha(self):
+        while True:
+            fim = self.buf.find(b"\r\n", self.ini, self.fim)
+            if fim >= 0:
+                linha = bytes(self.buf[self.ini:fim])
+                self.ini = fim + 2
+                return linha
+            self._encher()
+
+    def _bytes(self, n):
+        while self.fim - self.ini < n + 2:
+            self._encher()
+        dados = bytes(self.buf[self.ini:self.ini + n])
+        self.ini += n + 2
+        return dados
+
+    def _resposta(self):
+        linha = self._linha()
+        tipo, resto = linha[:1], linha[1:]
+        if tipo == b"+":
+            return resto.decode()
+        if tipo == b"-":
+            raise ErroRedis(resto.decode(errors="ignore"))
+        if tipo == b":":
+            return int(resto)
+        if tipo == b"$":
+            n = int(resto)
+            return None if n < 0 else self._bytes(n)
+        if tipo == b"*":
+            n = int(resto)
+            return None if n < 0 else [self._resposta() for _ in range(n)]
+        raise ErroRedis(f"resposta invalida: {linha!r}")
+
+    def executar(self, *partes):
+        if self.pendente:
+            # a proxima resposta desta conexao e a do BLPOP
+            raise ErroRedis("BLPOP pendente na conexao")
+        self.sock.sendall(comando(*partes))
+        return self._resposta()
+
+    def envia(self, cmd):
+        if self.pendente:
+            # recebe(timeout) voltou sem tabuleiro e o BLPOP segue esperando aqui
+            if self.envio is None:
+                self.envio = Conexao(self.lado, *self.sock.getpeername()[:2])
+            self.envio.envia(cmd)
+        else:
+            self.executar("RPUSH", self.chave_jogada, cmd)
+
+    def recebe(self, timeout=None):
+        # BLPOP ... 0 bloqueia no servidor; com timeout a espera local usa select
+        # e devolve None se nada chegou (o BLPOP continua pendente na conexao)
+        if not self.pendente:
+            self.sock.sendall(comando("BLPOP", self.chave_tabuleiro, "0"))
+            self.pendente = True
+        if timeout is not None and self.ini == self.fim and not self._encher(timeout):
+            return None
+        resposta = self._resposta()
+        self.pendente = False
+        return resposta[1].decode(errors="ignore") if resposta else ""
+
+class ConexaoAsync:
+    def __init__(self, lado, reader, writer):
+        self.lado = lado
+        self.chave_jogada = f"jogada_{lado}"
+        self.chave_tabuleiro = f"tabuleiro_{lado}"
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def abrir(cls, lado, ip="127.0.0.1", porta=10001):
+        reader, writer = await asyncio.open_connection(ip, int(porta))
+        return cls(lado, reader, writer)
+
+    async def fechar(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def _resposta(self):
+        linha = (await self.reader.readuntil(b"\r\n"))[:-2]
+        tipo, resto = linha[:1], linha[1:]
+        if tipo == b"+":
+            return resto.decode()
+        if tipo == b"-":
+            raise ErroRedis(resto.decode(errors="ignore"))
+        if tipo == b":":
+            return int(resto)
+        if tipo == b"$":
+            n = int(resto)
+            return None if n < 0 else (await self.reader.readexactly(n + 2))[:-2]
+        if tipo == b"*":
+            n = int(resto)
+            return None if n < 0 else [await self._resposta() for _ in range(n)]
+        raise ErroRedis(f"resposta invalida: {linha!r}")
+
+    async def executar(self, *partes):
+        self.writer.write(comando(*partes))
+        await self.writer.drain()
+        return await self._resposta()
+
+    async def envia(self, cmd):
+        await self.executar("RPUSH", self.chave_jogada, cmd)
+
+    async def recebe(self):
+        resposta = await self.executar("BLPOP", self.chave_tabuleiro, "0")
+        return resposta[1].decode(errors="ignore") if resposta else ""
+
+# interface igual a do conexao_tabuleiro para o main.py
+CONEXAO = None
+
+def conecta(argv):
+    global CONEXAO
+    lado, ip, porta = (a.decode() if isinstance(a, bytes) else a for a in argv[1:4])
+    CONEXAO = Conexao(lado, ip, porta)
+
+def recebe_raw():
+    return CONEXAO.recebe()
+
+def envia_raw(cmd: str):
+    CONEXAO.envia(cmd)
@@ -0,0 +1,85 @@
+EXATO, INFERIOR, SUPERIOR = 0, 1, 2
+
+POLITICAS = ("profundidade", "dois_niveis")
+
+class TabelaTransposicao:
+    # cada entrada e uma tupla (chave, val, tipo, prof, mov, geracao, contexto)
+    # "profundidade": um slot por indice, substitui se a nova busca for ao menos tao profunda
+    # ou se a entrada for de uma busca anterior
+    # "dois_niveis": dois slots por indice, o primeiro preferindo profundidade e o segundo
+    # sempre substituido
+    def __init__(self, tamanho=1 << 16, politica="profundidade"):
+        if politica not in POLITICAS:
+            raise ValueError(f"politica desconhecida: {politica}")
+        n = 1
+        while n < tamanho:
+            n <<= 1
+        self.tamanho = n
+        self.politica = politica
+        self.slots_por_indice = 2 if politica == "dois_niveis" else 1
+        self.mascara = n // self.slots_por_indice - 1
+        self.slots = [None] * n
+        self.geracao = 0
+        self.contexto = 0
+        self.consultas = 0
+        self.acertos = 0
+        self.armazenamentos = 0
+        self.substituicoes = 0
+
+    def nova_busca(self, contexto=0):
+        # contexto identifica o historico da partida (RECENT_BOARDS) que a avaliacao
+        # penaliza; de outro contexto so o lance e reaproveitado, nunca o valor
+        self.geracao += 1
+        self.contexto = contexto
+
+    def limpar(self):
+        self.slots = [None] * self.tamanho
+        self.geracao = 0
+
+    def consultar(self, chave):
+        self.consultas += 1
+        i = (chave & self.mascara) * self.slots_por_indice
+        for slot in range(i, i + self.slots_por_indice):
+            entrada = self.slots[slot]
+            if entrada is not None and entrada[0] == chave:
+                self.acertos += 1
+                if entrada[6] != self.contexto:
+                    return entrada[1], entrada[2], -1, entrada[4]
+                return entrada[1], entrada[2], entrada[3], entrada[4]
+        return None
+
+    def armazenar(self, chave, val, tipo, prof, mov):
+        self.armazenamentos += 1
+        i = (chave & self.mascara) * self.slots_por_indice
+        nova = (chave, val, tipo, prof, mov, self.geracao, self.contexto)
+        antiga = self.slots[i]
+        if antiga is None or antiga[0] == chave or antiga[5] != self.geracao or prof >= antiga[3]:
+            if antiga is not None and antiga[0] != chave:
+                self.substituicoes += 1
+            self.slots[i] = nova
+        elif self.slots_por_indice == 2:
+            if self.slots[i + 1] is not None and self.slots[i + 1][0] != chave:
+                self.substituicoes += 1
+            self.slots[i + 1] = nova
+
+    def ocupacao(self):
+        return sum(1 for entrada in self.slots if entrada is not None)
+
+    def relatorio(self):
+        return {
+            "tamanho": self.tamanho,
+            "politica": self.politica,
+            "ocupacao": self.ocupacao(),
+            "consultas": self.consultas,
+            "acertos": self.acertos,
+            "taxa_acerto": self.acertos / self.consultas if self.consultas else 0.0,
+            "armazenamentos": self.armazenamentos,
+            "substituicoes": self.substituicoes,
+        }
+
+TABELA = None
+
+def configurar(tamanho, politica="profundidade"):
+    global TABELA
+    TABELA = TabelaTransposicao(tamanho, politica) if tamanho > 0 else None
+    return TABELA
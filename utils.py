@@ -1,6 +1,74 @@
 from collections import deque
 RECENT_STATES_MAX = 10
-RECENT_BOARDS = deque(maxlen=RECENT_STATES_MAX)
+
+class Historico:
+    # ultimas posicoes da partida (hashes) com a contagem de cada uma, para count() O(1)
+    def __init__(self, maximo):
+        self.fila = deque()
+        self.maximo = maximo
+        self.contagem = {}
+
+    def append(self, h):
+        if len(self.fila) == self.maximo:
+            self._descontar(self.fila.popleft())
+        self.fila.append(h)
+        self.contagem[h] = self.contagem.get(h, 0) + 1
+
+    def extend(self, hashes):
+        for h in hashes:
+            self.append(h)
+
+    def clear(self):
+        self.fila.clear()
+        self.contagem.clear()
+
+    def count(self, h):
+        return self.contagem.get(h, 0)
+
+    def _descontar(self, h):
+        n = self.contagem[h] - 1
+        if n:
+            self.contagem[h] = n
+        else:
+            del self.contagem[h]
+
+    def __iter__(self):
+        return iter(self.fila)
+
+    def __len__(self):
+        return len(self.fila)
+
+class Caminho:
+    # posicoes da linha sendo buscada, da raiz ate o no atual: pilha para entrar/sair
+    # e contagem por hash para consultar repeticoes sem percorrer nada
+    def __init__(self):
+        self.pilha = []
+        self.contagem = {}
+
+    def entrar(self, h):
+        self.pilha.append(h)
+        self.contagem[h] = self.contagem.get(h, 0) + 1
+
+    def sair(self):
+        h = self.pilha.pop()
+        n = self.contagem[h] - 1
+        if n:
+            self.contagem[h] = n
+        else:
+            del self.contagem[h]
+
+    def count(self, h):
+        return self.contagem.get(h, 0)
+
+    def clear(self):
+        self.pilha.clear()
+        self.contagem.clear()
+
+RECENT_BOARDS = Historico(RECENT_STATES_MAX)
+CAMINHO = Caminho()
+
+def historico_chave():
+    return hash(tuple(RECENT_BOARDS))
 
 def board_to_key(board):
     return ''.join(''.join(row) for row in board)
@@ -0,0 +1,48 @@
+import random
+from bitboard import NUM_CASAS, INDICE, ESPELHO, motor_de
+
+_rng = random.Random(0x6f6e6361)
+_onca = [_rng.getrandbits(64) for _ in range(NUM_CASAS)]
+_cao = [_rng.getrandbits(64) for _ in range(NUM_CASAS)]
+# cada chave carrega nos 64 bits altos a chave da casa espelhada, entao o hash de uma
+# posicao traz junto o da sua imagem e a forma canonica sai sem recalcular nada
+Z_ONCA = [_onca[i] | _onca[ESPELHO[i]] << 64 for i in range(NUM_CASAS)]
+Z_CAO = [_cao[i] | _cao[ESPELHO[i]] << 64 for i in range(NUM_CASAS)]
+MASCARA = (1 << 64) - 1
+# xor na chave da tabela quando e a vez da onca; o hash do tabuleiro em si nao inclui a vez
+Z_VEZ_ONCA = _rng.getrandbits(64)
+
+def hash_tabuleiro(board):
+    motor = motor_de(board)
+    h = 0
+    for casa in motor.find_all_pieces_local(board, 'o'):
+        h ^= Z_ONCA[INDICE[casa]]
+    for casa in motor.find_all_pieces_local(board, 'c'):
+        h ^= Z_CAO[INDICE[casa]]
+    return h
+
+def atualizar(h, mov, lado):
+    if len(mov) == 3 and mov[2] == 'salto_consecutivo':
+        caminho = mov[0]
+        h ^= Z_ONCA[INDICE[caminho[0]]] ^ Z_ONCA[INDICE[caminho[-1]]]
+        for i in range(len(caminho) - 1):
+            (l1, c1), (l2, c2) = caminho[i], caminho[i + 1]
+            h ^= Z_CAO[INDICE[((l1 + l2) // 2, (c1 + c2) // 2)]]
+        return h
+    origem, destino, captura = mov
+    z = Z_ONCA if lado == 'o' else Z_CAO
+    h ^= z[INDICE[origem]] ^ z[INDICE[destino]]
+    if captura:
+        h ^= Z_CAO[INDICE[captura]]
+    return h
+
+def espelhada(h):
+    # a posicao nao e a canonica: lances guardados sob a chave dela estao espelhados
+    return h >> 64 < h & MASCARA
+
+def canonica(h):
+    return min(h >> 64, h & MASCARA)
+
+def chave_tabela(h, maximizando):
+    h = canonica(h)
+    return h ^ Z_VEZ_ONCA if maximizando else h